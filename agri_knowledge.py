@@ -3,87 +3,19 @@ Simple Agricultural Knowledge Base
 Provides basic farming advice without requiring AI model
 """
 
+from intent_router import intent_router
+from knowledge_store import knowledge_store
+
 class SimpleAgriKnowledge:
-    def __init__(self):
-        self.crop_info = {
-            'wheat': {
-                'planting_season': 'Rabi season (November-December)',
-                'harvest_time': '4-6 months after planting',
-                'soil_type': 'Well-drained loamy soil with pH 6-7',
-                'watering': 'Requires 4-6 irrigations during growth period'
-            },
-            'rice': {
-                'planting_season': 'Kharif season (June-July)',
-                'harvest_time': '3-6 months after planting',
-                'soil_type': 'Clay or clay loam soil with good water retention',
-                'watering': 'Requires continuous standing water in early stages'
-            },
-            'corn': {
-                'planting_season': 'Kharif season (June-July)',
-                'harvest_time': '3-4 months after planting',
-                'soil_type': 'Well-drained fertile soil with pH 6-6.8',
-                'watering': 'Deep watering 1-2 times per week'
-            },
-            'tomato': {
-                'planting_season': 'Year-round with proper care',
-                'harvest_time': '2-3 months after transplanting',
-                'soil_type': 'Well-drained organic-rich soil with pH 6-6.8',
-                'watering': 'Regular watering, avoid overwatering'
-            }
-        }
-        
-        self.general_tips = {
-            'soil_preparation': [
-                'Test soil pH before planting',
-                'Add organic compost to improve soil structure',
-                'Ensure proper drainage to prevent waterlogging',
-                'Till soil to appropriate depth based on crop requirements'
-            ],
-            'fertilizer_basics': [
-                'Use organic fertilizers for long-term soil health',
-                'Apply nitrogen for leaf growth, phosphorus for roots, potassium for disease resistance',
-                'Follow soil test recommendations for fertilizer amounts',
-                'Apply fertilizers at the right growth stages'
-            ],
-            'pest_management': [
-                'Use integrated pest management (IPM) approach',
-                'Identify pests correctly before treatment',
-                'Encourage beneficial insects in your garden',
-                'Rotate crops to break pest cycles'
-            ],
-            'water_management': [
-                'Water early morning or evening to reduce evaporation',
-                'Use drip irrigation or soaker hoses for efficiency',
-                'Mulch around plants to retain moisture',
-                'Check soil moisture before watering'
-            ]
-        }
-        
-        self.market_resources = {
-            'government_sites': [
-                'eNAM (National Agriculture Market): enam.gov.in',
-                'Agmarknet: agmarknet.gov.in', 
-                'Ministry of Agriculture: agricoop.gov.in',
-                'National Sample Survey Office: mospi.gov.in'
-            ],
-            'mobile_apps': [
-                'eNAM App - Official government app',
-                'Kisan Suvidha App - Weather, market prices, advisories',
-                'AgriApp - Market prices and farming tips',
-                'Crop Insurance App - Prices and insurance info'
-            ],
-            'exchanges': [
-                'MCX (Multi Commodity Exchange)',
-                'NCDEX (National Commodity & Derivatives Exchange)',
-                'Local commodity exchanges'
-            ]
-        }
-
-    def get_crop_advice(self, crop_name):
-        """Get basic advice for a specific crop"""
+    def __init__(self, store=knowledge_store):
+        # Crop guidance, tips and market resources live in the knowledge store (see knowledge_store.py)
+        self.store = store
+
+    def get_crop_advice(self, crop_name, query=None):
+        """Get basic advice for a specific crop, for the region/season named in `query` if there is one"""
         crop_name = crop_name.lower().strip()
-        if crop_name in self.crop_info:
-            info = self.crop_info[crop_name]
+        info = self.store.crop(crop_name, query)
+        if info:
             advice = f"For {crop_name.capitalize()}:\n"
             advice += f"• Planting: {info['planting_season']}\n"
             advice += f"• Harvest: {info['harvest_time']}\n"
@@ -96,32 +28,39 @@ class SimpleAgriKnowledge:
         """Get general farming advice"""
         topic = topic.lower().strip()
         
-        # Find matching topic
-        for key, tips in self.general_tips.items():
+        # Find matching topic, preferring an exact key
+        keys = self.store.keys('tips')
+        matches = [topic] if topic in keys else keys
+        for key in matches:
             if topic in key or any(word in topic for word in key.split('_')):
+                tips = self.store.notes('tips', key)
                 advice = f"Here are some tips for {key.replace('_', ' ')}:\n"
                 for i, tip in enumerate(tips, 1):
                     advice += f"{i}. {tip}\n"
                 return advice.strip()
         return None
 
+    # Router topics answered with the general tips
+    TOPIC_TIPS = {
+        'soil': 'soil_preparation',
+        'fertilizer': 'fertilizer_basics',
+        'pest': 'pest_management',
+        'irrigation': 'water_management'
+    }
+
     def search_advice(self, query):
         """Search for relevant advice based on query"""
-        query = query.lower()
+        route = intent_router.route(query)
+        crop = route.crop if route.crop and self.store.crop(route.crop) else None
         
         # First check if this is a price/market query
-        price_keywords = ['price', 'cost', 'rate', 'market', 'sell', 'buy', 'मूल्य', 'कीमत', 'दर', 'बाज़ार']
-        if any(keyword in query for keyword in price_keywords):
+        if route.intent == "market":
             # Try to get real-time price data
             try:
                 from market_api import get_market_price_response
                 
-                # Extract crop name from query if present
-                mentioned_crop = None
-                for crop in self.crop_info.keys():
-                    if crop in query:
-                        mentioned_crop = crop
-                        break
+                # Crop name mentioned in the query, if any
+                mentioned_crop = crop
                 
                 if mentioned_crop:
                     # Get live price data
@@ -135,11 +74,7 @@ class SimpleAgriKnowledge:
                 pass
             
             # Fallback static response
-            mentioned_crop = None
-            for crop in self.crop_info.keys():
-                if crop in query:
-                    mentioned_crop = crop.capitalize()
-                    break
+            mentioned_crop = crop.capitalize() if crop else None
             
             crop_text = f" for {mentioned_crop}" if mentioned_crop else ""
             
@@ -147,15 +82,15 @@ class SimpleAgriKnowledge:
             response += "I don't have access to real-time market prices as they change daily. Here are the best sources for current prices:\n\n"
             
             response += "🏪 **Government Resources:**\n"
-            for site in self.market_resources['government_sites']:
+            for site in self.store.notes('resources', 'government_sites'):
                 response += f"• {site}\n"
             
             response += "\n📱 **Mobile Apps:**\n"  
-            for app in self.market_resources['mobile_apps']:
+            for app in self.store.notes('resources', 'mobile_apps'):
                 response += f"• {app}\n"
                 
             response += "\n📈 **Commodity Exchanges:**\n"
-            for exchange in self.market_resources['exchanges']:
+            for exchange in self.store.notes('resources', 'exchanges'):
                 response += f"• {exchange}\n"
                 
             response += "\n💡 **Quick Tips:**\n"
@@ -170,32 +105,164 @@ class SimpleAgriKnowledge:
             return response
         
         # Check for specific crops (but not if it's a price query)
-        for crop in self.crop_info.keys():
-            if crop in query:
-                return self.get_crop_advice(crop)
+        if crop:
+            return self.get_crop_advice(crop, query)
         
         # Check for general topics
-        for topic in self.general_tips.keys():
-            if any(word in query for word in topic.split('_')):
-                return self.get_general_advice(topic)
+        for topic, tips in self.TOPIC_TIPS.items():
+            if topic in route.topics:
+                return self.get_general_advice(tips)
         
         # Check for common farming terms
-        if any(term in query for term in ['plant', 'grow', 'farm', 'खेती', 'फसल', 'किसान']):
+        if 'farming' in route.topics:
             return "For successful farming: Choose the right crops for your climate, prepare soil properly, maintain proper spacing, provide adequate water and nutrients, and monitor for pests and diseases regularly."
         
-        if any(term in query for term in ['season', 'when', 'time', 'मौसम', 'कब', 'समय']):
+        if 'timing' in route.topics:
             return "Planting seasons vary by crop and location. Kharif crops (rice, corn) are planted in monsoon (June-July). Rabi crops (wheat, peas) are planted in winter (November-December). Check local agricultural extension services for specific timing in your area."
         
-        if any(term in query for term in ['soil', 'मिट्टी', 'भूमि']):
-            return "Soil health is crucial for farming. Test soil pH (should be 6-7 for most crops), add organic compost, ensure proper drainage, and avoid overuse of chemical fertilizers. Different crops need different soil types."
-        
-        if any(term in query for term in ['water', 'irrigation', 'पानी', 'सिंचाई']):
-            return "Water management tips: Water early morning or evening, use drip irrigation for efficiency, check soil moisture before watering, and mulch around plants to retain moisture."
-        
-        if any(term in query for term in ['fertilizer', 'खाद', 'उर्वरक']):
-            return "Fertilizer guidance: Use organic fertilizers for long-term soil health, apply NPK (Nitrogen-Phosphorus-Potassium) based on crop needs, follow soil test recommendations, and don't over-fertilize."
-        
         return None
 
+    def covered_answer(self, query, intent):
+        """
+        The knowledge-base answer for a question classified as `intent`
+        ("market" or "kb"), only when it answers the whole question; None
+        sends the question to the retrieval chain instead.
+        """
+        route = intent_router.route(query)
+        if route.uncovered:
+            return None
+        if intent == "market":
+            try:
+                from market_api import market_api
+            except ImportError:
+                return None
+            if route.intent != "market" or not route.crop or not market_api.covers(route.crop):
+                return None
+        elif route.intent is not None:
+            return None
+        elif route.crop:
+            # The crop card covers growing the crop in general, not a topic such as its pests or fertilizer
+            if route.topics - {'farming'} or not self.store.crop(route.crop):
+                return None
+        elif len(route.topics) == 1:
+            # One topic, with its modifiers (soil pH, organic fertilizer, ...)
+            return get_smart_agriculture_response(query)
+        else:
+            return None
+        return self.search_advice(query)
+
+def get_smart_agriculture_response(query):
+    """Generate intelligent responses for agriculture questions"""
+    route = intent_router.route(query)
+    
+    # First check if this is a price/market related query
+    if route.intent == "market":
+        try:
+            from market_api import get_market_price_response
+            
+            # Crop name mentioned in the query, if any
+            mentioned_crop = route.crop
+            
+            if mentioned_crop:
+                return get_market_price_response(mentioned_crop)
+            else:
+                return get_market_price_response("wheat")  # Default to wheat
+                
+        except ImportError:
+            # Fallback if API module not available
+            pass
+        
+        return """💰 **Market Price Information:**
+
+I don't have access to current market prices as they change daily. For up-to-date crop prices, try these resources:
+
+🏪 **Local Markets:**
+• Visit your nearest mandi (wholesale market)
+• Contact local traders and commission agents
+• Check with cooperative societies
+
+📱 **Digital Resources:**
+• Government agriculture department websites
+• Mobile apps like eNAM, AgriApp, KisanSuvidha
+• Commodity exchange websites (MCX, NCDEX)
+
+📺 **News & Media:**
+• Agriculture news channels
+• Newspaper agriculture sections
+• Radio agriculture programs
+
+**Note:** Prices vary by location, quality, season, and market conditions.
+
+Would you like farming advice for growing this crop instead? 🌱"""
+    
+    # Check for specific crop questions (but not if it was a price query)
+    crop_info = knowledge_store.crop(route.crop, query) if route.crop else None
+    if crop_info and crop_info['guide']:
+        crop, info = route.crop, crop_info['guide']
+        return f"🌱 **{crop.title()} Farming Guide:**\n{info}\n\nWould you like to know more about {crop} diseases, fertilizers, or harvesting techniques?"
+    
+    # Check for soil-related questions
+    if route.topic == "soil":
+        if "ph" in route.modifiers:
+            return f"🌍 **Soil pH Information:**\n{knowledge_store.note('soil', 'ph')}\n\nWould you like to know about testing soil pH or adjusting it for specific crops?"
+        elif "fertility" in route.modifiers:
+            return f"🌍 **Soil Fertility Guide:**\n{knowledge_store.note('soil', 'fertility')}\n\nWant to learn about specific nutrients or composting?"
+        else:
+            return f"🌍 **Soil Preparation:**\n{knowledge_store.note('soil', 'preparation')}\n\nNeed help with specific soil problems or crop-specific soil requirements?"
+    
+    # Check for fertilizer questions
+    if route.topic == "fertilizer":
+        if "organic" in route.modifiers:
+            return f"🌿 **Organic Fertilizers:**\n{knowledge_store.note('fertilizer', 'organic')}\n\nInterested in making your own compost or learning about specific organic fertilizers?"
+        elif "synthetic" in route.modifiers:
+            return f"⚗️ **Synthetic Fertilizers:**\n{knowledge_store.note('fertilizer', 'synthetic')}\n\nNeed help calculating fertilizer amounts or understanding NPK ratios for your crops?"
+        else:
+            return f"🌱 **Fertilizer Timing:**\n{knowledge_store.note('fertilizer', 'timing')}\n\nWhat specific crops are you fertilizing? I can provide more targeted advice!"
+    
+    # Check for pest control questions
+    if route.topic == "pest":
+        if "organic" in route.modifiers:
+            return f"🐛 **Organic Pest Control:**\n{knowledge_store.note('pest_control', 'organic')}\n\nWhat specific pests are you dealing with? I can suggest targeted organic solutions!"
+        elif "prevent" in route.modifiers:
+            return f"🛡️ **Pest Prevention:**\n{knowledge_store.note('pest_control', 'prevention')}\n\nWhat crops are you growing? Prevention strategies vary by crop type!"
+        else:
+            return f"🔬 **Integrated Pest Management:**\n{knowledge_store.note('pest_control', 'ipm')}\n\nAre you dealing with a specific pest problem? Describe the symptoms and affected crops!"
+    
+    # Weather and climate questions
+    if route.topic == "weather":
+        return "🌤️ **Weather & Agriculture:**\nWeather greatly affects farming success. Monitor temperature, rainfall, and seasonal patterns. Most crops need consistent water but avoid waterlogging. Use weather forecasts for planting and harvesting decisions.\n\nWhat's your local climate like? I can suggest suitable crops!"
+    
+    # Irrigation questions
+    if route.topic == "irrigation":
+        return "💧 **Irrigation Guide:**\nProper watering is crucial! Deep, less frequent watering is usually better than shallow, frequent watering. Consider drip irrigation for efficiency. Water early morning or evening to reduce evaporation.\n\nWhat crops are you watering? Each has different water needs!"
+    
+    # Seasonal/timing questions
+    if route.topic == "timing":
+        return "📅 **Farming Calendar:**\nTiming depends on your location and crop choice. Generally:\n• **Spring:** Plant warm-season crops after last frost\n• **Summer:** Maintain crops, harvest early varieties\n• **Fall:** Plant cool-season crops, harvest summer crops\n• **Winter:** Plan next year, maintain equipment\n\nWhat's your location and which crops interest you?"
+    
+    # General farming questions
+    if route.topic == "farming":
+        return "🚜 **General Farming Tips:**\nSuccessful farming involves: good soil preparation, choosing right crops for your climate, proper timing, regular monitoring, and continuous learning.\n\n**Key Success Factors:**\n• Know your soil and climate\n• Choose appropriate varieties\n• Practice crop rotation\n• Monitor for pests/diseases\n• Keep detailed records\n\nWhat specific aspect of farming would you like to explore?"
+    
+    # Default engaging response
+    return """🌾 **Welcome to AgriGenius!** 🌾
+
+I'm here to help with all your farming questions! I can assist with:
+
+🌱 **Crops:** Wheat, Rice, Corn, Tomatoes, and more
+🌍 **Soil:** pH testing, fertility, preparation
+🌿 **Fertilizers:** Organic and synthetic options
+🐛 **Pest Control:** Natural and chemical solutions  
+💧 **Irrigation:** Water management techniques
+📅 **Timing:** When to plant and harvest
+
+**Try asking me:**
+• "How do I grow tomatoes?"
+• "What's the best soil pH for wheat?"
+• "How to control pests organically?"
+• "When should I plant corn?"
+
+What farming challenge can I help you solve today? 🚜"""
+
 # Initialize the knowledge base
 agri_knowledge = SimpleAgriKnowledge()
@@ -0,0 +1,123 @@
+"""
+Semantic Answer Cache
+Reuses LLM answers for questions whose embeddings are near-identical to earlier ones
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("AGRI_ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_SIZE = int(os.getenv("AGRI_ANSWER_CACHE_SIZE", "2000"))
+ANSWER_CACHE_TTL = float(os.getenv("AGRI_ANSWER_CACHE_TTL", str(24 * 3600)))
+
+class SemanticAnswerCache:
+    """
+    LRU + TTL cache of answers keyed by normalised query embedding.
+
+    Embeddings sit in a preallocated matrix, so a lookup is one
+    matrix-vector product over at most `max_entries` rows. A hit needs
+    cosine similarity of at least `threshold`. Call `invalidate()` when the
+    index is rebuilt, since cached answers came from the old documents.
+    Callers read `generation` before computing an answer and pass it to
+    `put()`, so an answer still being generated from the old index when
+    `invalidate()` runs is dropped rather than cached.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, max_entries=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._reset()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    def _reset(self):
+        self._matrix = None
+        self._created = None
+        self._entries = OrderedDict()  # slot -> (answer, compute_seconds); creation times are in self._created
+        self._free = []
+
+    def _normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, query_vector):
+        """Return a cached answer for a near-identical question, or None"""
+        query_vector = self._normalize(query_vector)
+        now = time.time()
+        with self._lock:
+            if self._entries:
+                slots = np.fromiter(self._entries.keys(), dtype=np.int64, count=len(self._entries))
+                # Expired entries are dropped first so they can't outscore a live near match
+                expired = now - self._created[slots] > self.ttl
+                if expired.any():
+                    for slot in slots[expired]:
+                        self._evict(int(slot))
+                    slots = slots[~expired]
+            if self._entries:
+                scores = self._matrix[slots] @ query_vector
+                best = int(np.argmax(scores))
+                slot = int(slots[best])
+                answer, compute_seconds = self._entries[slot]
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(slot)
+                    self.hits += 1
+                    self.seconds_saved += compute_seconds
+                    return answer
+            self.misses += 1
+            return None
+
+    def put(self, query_vector, answer, compute_seconds=0.0, generation=None):
+        """Remember `answer`, evicting the least recently used entry when full"""
+        query_vector = self._normalize(query_vector)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, len(query_vector)), dtype=np.float32)
+                self._created = np.zeros(self.max_entries, dtype=np.float64)
+                self._free = list(range(self.max_entries - 1, -1, -1))
+            if not self._free:
+                self._evict(next(iter(self._entries)))
+            slot = self._free.pop()
+            self._matrix[slot] = query_vector
+            self._created[slot] = time.time()
+            self._entries[slot] = (answer, compute_seconds)
+
+    def _evict(self, slot):
+        del self._entries[slot]
+        self._free.append(slot)
+
+    def invalidate(self):
+        """Drop every cached answer, e.g. after the index was rebuilt"""
+        with self._lock:
+            self._reset()
+            self.generation += 1
+        logger.info("Semantic answer cache invalidated")
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "seconds_saved": round(self.seconds_saved, 2),
+                "threshold": self.threshold
+            }
+
+# Initialize the answer cache
+answer_cache = SemanticAnswerCache()
@@ -1,48 +1,67 @@
 # app.py
-from flask import Flask, render_template, request, jsonify
-import os
-import sys
+from lazy_imports import import_profile, LazyObject, is_loaded
 
-# Add debug information
-print("=== AgriGenius Startup Debug ===")
-print(f"Python version: {sys.version}")
-print(f"Working directory: {os.getcwd()}")
-print(f"Files in directory: {os.listdir('.')}")
+# Time every import until the app is set up; see the startup report in the log and /metrics
+import_profile.start()
+
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
+import re
+import contextlib
+import json
+import time
+import threading
+
+# The retrieval pipeline (langchain, the vector store, the embedding model and the LLM client) is
+# imported by the index builder thread, see load_pipeline()
+fetch_websites = None
+extract_pdf_pages = None
+sync_vector_store = None
+content_hash = None
+file_hash = None
+setup_retrieval_qa = None
+stream_retrieval_qa = None
+llm_gateway = None
+
+# googletrans and its Translator() are loaded by the first request that needs a translation
+multi_lang = LazyObject("translator", "multi_lang", import_profile)
+
+from response_catalog import DEVELOPER_ANSWER, EMPTY_QUERY_ANSWER, ERROR_ANSWER
 
 try:
-    from chat1 import fetch_website_content, extract_pdf_text, initialize_vector_store
-    from chat2 import llm, setup_retrieval_qa
-    from translator import multi_lang
-    from agri_knowledge import agri_knowledge
-    print("✅ Advanced AI modules loaded successfully")
-    AI_MODE = True
-except ImportError as e:
-    print(f"⚠️ Import error with AI modules: {e}")
-    AI_MODE = False
-    try:
-        from simple_chat import fetch_website_content, extract_pdf_text, initialize_vector_store, setup_retrieval_qa
-        llm = None
-        print("✅ Fallback modules loaded")
-        AI_MODE = True
-    except ImportError as e2:
-        print(f"❌ Critical error: {e2}")
-        fetch_website_content = None
-        extract_pdf_text = None
-        initialize_vector_store = None
-        llm = None
-        setup_retrieval_qa = None
-    
-    try:
-        from translator import multi_lang
-    except ImportError:
-        multi_lang = None
-        print("⚠️ Translation features not available")
-    
-    try:
-        from agri_knowledge import agri_knowledge
-    except ImportError:
-        agri_knowledge = None
-        print("⚠️ Knowledge base not available")
+    from agri_knowledge import agri_knowledge, get_smart_agriculture_response
+except ImportError:
+    agri_knowledge = None
+    print("⚠️ Knowledge base not available")
+
+    def get_smart_agriculture_response(query):
+        return ERROR_ANSWER
+
+from intent_router import intent_router
+
+try:
+    from response_cache import response_cache
+except ImportError:
+    response_cache = None
+    print("⚠️ Response cache not available")
+
+try:
+    from answer_cache import answer_cache
+except ImportError:
+    answer_cache = None
+    print("⚠️ Semantic answer cache not available")
+
+# Only read by /metrics; loaded with the pipeline
+context_packer = LazyObject("context_packer", "context_packer", import_profile)
+
+try:
+    from response_catalog import response_catalog
+except ImportError:
+    response_catalog = None
+
+try:
+    from intent_classifier import intent_classifier
+except ImportError:
+    intent_classifier = None
 
 import logging
 
@@ -52,49 +71,96 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Where a streamed line may be cut before its end: after a sentence ending in a letter, so list
+# numbers like "1." stay with their item
+_SENTENCE_END_RE = re.compile(r"(?<=[^\W\d_][.!?।])\s+")
+
 # Example URLs and PDF files
 urls = ["https://mospi.gov.in/4-agricultural-statistics"]   #"https://desagri.gov.in/",
 pdf_files = ["Data/Farming Schemes.pdf", "Data/farmerbook.pdf"]
 
+# Index build state, shared with the /ready endpoint
+_state_lock = threading.Lock()
+build_status = {
+    "state": "starting",
+    "stage": None,
+    "sources_done": 0,
+    "sources_total": 0,
+    "started_at": None,
+    "finished_at": None
+}
+
+def _update_build_status(**changes):
+    with _state_lock:
+        build_status.update(changes)
+
+def load_pipeline():
+    """Import the retrieval pipeline, the AI modules when they are installed and the simple ones otherwise"""
+    global fetch_websites, extract_pdf_pages, sync_vector_store, content_hash, file_hash
+    global setup_retrieval_qa, stream_retrieval_qa, llm_gateway
+    started = time.perf_counter()
+    try:
+        from chat1 import fetch_websites, extract_pdf_pages, sync_vector_store, content_hash, file_hash
+        from chat2 import setup_retrieval_qa, stream_retrieval_qa, llm_gateway
+        print("✅ Advanced AI modules loaded successfully")
+    except ImportError as e:
+        print(f"⚠️ Import error with AI modules: {e}")
+        try:
+            from simple_chat import fetch_websites, extract_pdf_pages, sync_vector_store, content_hash, file_hash, setup_retrieval_qa
+            print("✅ Fallback modules loaded")
+        except ImportError as e2:
+            print(f"❌ Critical error: {e2}")
+    import_profile.record_deferred("pipeline", time.perf_counter() - started)
+
 # Initialize the application
 def initialize_app():
-    if not (fetch_website_content and extract_pdf_text and initialize_vector_store and setup_retrieval_qa):
+    load_pipeline()
+    if not (fetch_websites and extract_pdf_pages and sync_vector_store and setup_retrieval_qa):
         logger.error("Required functions not available due to import errors")
         return None, None
         
     try:
-        # Fetch content from websites
+        # Each source is (id, content hash, loader); unchanged sources are not re-embedded
+        sources = []
+
+        # Fetch content from websites (conditional GETs, stripped to main text)
         logger.info("Fetching website content...")
-        website_contents = []
+        _update_build_status(stage="fetching")
+        try:
+            website_contents = fetch_websites(urls)
+        except Exception as e:
+            logger.warning(f"Failed to fetch website content: {str(e)}")
+            website_contents = {}
         for url in urls:
-            try:
-                content = fetch_website_content(url)
-                if content:
-                    website_contents.append(content)
-            except Exception as e:
-                logger.warning(f"Failed to fetch content from {url}: {str(e)}")
-
-        # Extract text from PDF files
-        logger.info("Extracting PDF content...")
-        pdf_texts = []
+            content = website_contents.get(url, "")
+            if content:
+                sources.append((url, content_hash(content), lambda content=content: content))
+            else:
+                # Keep whatever is already indexed for this URL
+                sources.append((url, None, None))
+
+        # Hash PDF files; pages are only extracted (and streamed into chunking) when the file changed
+        logger.info("Checking PDF content...")
+        _update_build_status(stage="hashing")
         for pdf_file in pdf_files:
             try:
-                text = extract_pdf_text(pdf_file)
-                if text:
-                    pdf_texts.append(text)
-            except Exception as e:
-                logger.warning(f"Failed to extract text from {pdf_file}: {str(e)}")
-
-        # Combine all content into chunks
-        all_contents = website_contents + pdf_texts
-        
-        if not all_contents:
+                digest = file_hash(pdf_file)
+            except OSError as e:
+                logger.warning(f"Failed to read {pdf_file}: {str(e)}")
+                continue
+            sources.append((pdf_file, digest, lambda pdf_file=pdf_file: extract_pdf_pages(pdf_file)))
+
+        if not sources:
             logger.warning("No content available, creating basic chatbot")
             return None, None
 
-        # Initialize the vector store
-        logger.info("Initializing vector store...")
-        db = initialize_vector_store(all_contents)
+        # Load the persistent vector store, re-embedding only changed sources
+        logger.info("Loading vector store...")
+        _update_build_status(stage="indexing", sources_total=len(sources))
+        db = sync_vector_store(
+            sources,
+            progress=lambda done, total: _update_build_status(sources_done=done, sources_total=total)
+        )
         
         if db is None:
             logger.warning("Failed to initialize vector store, creating basic chatbot")
@@ -102,6 +168,7 @@ def initialize_app():
 
         # Set up the RetrievalQA chain
         logger.info("Setting up retrieval QA chain...")
+        _update_build_status(stage="chain")
         chain = setup_retrieval_qa(db)
         
         return db, chain
@@ -109,156 +176,48 @@ def initialize_app():
         logger.error(f"Error during initialization: {str(e)}")
         return None, None
 
-# Initialize the components
-print("Starting AgriGenius initialization...")
-db, chain = initialize_app()
-
-if chain is not None:
-    print("✅ AgriGenius AI system initialized successfully!")
-else:
-    print("⚠️ AgriGenius running in basic mode - AI features are not available")
-
-# Simple agriculture knowledge base for fallback
-SIMPLE_AGRICULTURE_KB = {
-    'crops': {
-        'wheat': "Wheat grows best in well-drained loamy soil with pH 6.0-7.5. Plant in fall/winter, needs 12-15 inches of water annually. Harvest when grain moisture is 13-14%.",
-        'rice': "Rice requires flooded fields or high moisture. Plant in warm weather (75-85°F). Needs 40-70 inches of water. Harvest when grains are golden and firm.",
-        'corn': "Corn needs warm weather (60-95°F), well-drained soil with pH 6.0-6.8. Plant after soil reaches 50°F. Requires 20-30 inches of water during growing season.",
-        'tomato': "Tomatoes need warm weather (65-85°F), well-drained soil with pH 6.0-6.8. Start indoors 6-8 weeks before last frost. Need consistent watering and support structures."
-    },
-    'soil': {
-        'ph': "Soil pH affects nutrient availability. Most crops prefer pH 6.0-7.0. Test annually and adjust with lime (raise pH) or sulfur (lower pH).",
-        'fertility': "Good soil needs organic matter, proper drainage, and balanced nutrients (NPK). Add compost, rotate crops, and test soil every 2-3 years.",
-        'preparation': "Prepare soil by tilling 8-12 inches deep, removing weeds, adding organic matter, and ensuring proper drainage before planting."
-    },
-    'fertilizer': {
-        'organic': "Organic fertilizers include compost, manure, bone meal, and fish emulsion. They release nutrients slowly and improve soil structure.",
-        'synthetic': "Synthetic fertilizers provide quick nutrients. Common ratios: 10-10-10 (balanced), 20-10-10 (high nitrogen for leafy growth).",
-        'timing': "Apply fertilizer based on soil tests and crop needs. Generally: pre-plant, side-dress during growth, and avoid over-fertilizing."
-    },
-    'pest_control': {
-        'ipm': "Integrated Pest Management combines biological, cultural, physical, and chemical controls. Monitor regularly, identify pests correctly, and use least toxic methods first.",
-        'organic': "Organic pest control includes beneficial insects, neem oil, diatomaceous earth, crop rotation, and companion planting.",
-        'prevention': "Prevent pests through healthy soil, proper spacing, crop rotation, sanitation, and encouraging beneficial insects."
-    }
-}
+# Requests are answered by the knowledge base fallbacks until the chain is swapped in
+db, chain = None, None
 
-def get_smart_agriculture_response(query):
-    """Generate intelligent responses for agriculture questions"""
-    query_lower = query.lower()
-    
-    # First check if this is a price/market related query
-    price_keywords = ['price', 'cost', 'rate', 'market', 'sell', 'buy', 'mandi', 'wholesale', 'retail', 'मूल्य', 'कीमत', 'दर', 'बाज़ार']
-    if any(keyword in query_lower for keyword in price_keywords):
+def _build_index_in_background():
+    global db, chain
+    _update_build_status(state="building", started_at=time.time())
+    if intent_classifier is not None:
+        # Training (and cross-validating) the router takes seconds; do it before the chain can be used
         try:
-            from market_api import get_market_price_response
-            
-            # Extract crop name from query if present
-            mentioned_crop = None
-            for crop in SIMPLE_AGRICULTURE_KB['crops'].keys():
-                if crop in query_lower:
-                    mentioned_crop = crop
-                    break
-            
-            if mentioned_crop:
-                return get_market_price_response(mentioned_crop)
-            else:
-                return get_market_price_response("wheat")  # Default to wheat
-                
-        except ImportError:
-            # Fallback if API module not available
-            pass
-        
-        return """💰 **Market Price Information:**
-
-I don't have access to current market prices as they change daily. For up-to-date crop prices, try these resources:
-
-🏪 **Local Markets:**
-• Visit your nearest mandi (wholesale market)
-• Contact local traders and commission agents
-• Check with cooperative societies
-
-📱 **Digital Resources:**
-• Government agriculture department websites
-• Mobile apps like eNAM, AgriApp, KisanSuvidha
-• Commodity exchange websites (MCX, NCDEX)
-
-📺 **News & Media:**
-• Agriculture news channels
-• Newspaper agriculture sections
-• Radio agriculture programs
-
-**Note:** Prices vary by location, quality, season, and market conditions.
+            intent_classifier.load()
+        except Exception as e:
+            logger.warning(f"Intent classifier not available, every question goes to the chain: {e}")
+    new_db, new_chain = initialize_app()
 
-Would you like farming advice for growing this crop instead? 🌱"""
-    
-    # Check for specific crop questions (but not if it was a price query)
-    for crop, info in SIMPLE_AGRICULTURE_KB['crops'].items():
-        if crop in query_lower:
-            return f"🌱 **{crop.title()} Farming Guide:**\n{info}\n\nWould you like to know more about {crop} diseases, fertilizers, or harvesting techniques?"
-    
-    # Check for soil-related questions
-    if any(word in query_lower for word in ['soil', 'ph', 'fertility', 'ground']):
-        if 'ph' in query_lower:
-            return f"🌍 **Soil pH Information:**\n{SIMPLE_AGRICULTURE_KB['soil']['ph']}\n\nWould you like to know about testing soil pH or adjusting it for specific crops?"
-        elif any(word in query_lower for word in ['fertile', 'fertility', 'nutrient']):
-            return f"🌍 **Soil Fertility Guide:**\n{SIMPLE_AGRICULTURE_KB['soil']['fertility']}\n\nWant to learn about specific nutrients or composting?"
-        else:
-            return f"🌍 **Soil Preparation:**\n{SIMPLE_AGRICULTURE_KB['soil']['preparation']}\n\nNeed help with specific soil problems or crop-specific soil requirements?"
-    
-    # Check for fertilizer questions
-    if any(word in query_lower for word in ['fertilizer', 'fertiliser', 'nutrient', 'feed']):
-        if 'organic' in query_lower:
-            return f"🌿 **Organic Fertilizers:**\n{SIMPLE_AGRICULTURE_KB['fertilizer']['organic']}\n\nInterested in making your own compost or learning about specific organic fertilizers?"
-        elif any(word in query_lower for word in ['synthetic', 'chemical', 'npk']):
-            return f"⚗️ **Synthetic Fertilizers:**\n{SIMPLE_AGRICULTURE_KB['fertilizer']['synthetic']}\n\nNeed help calculating fertilizer amounts or understanding NPK ratios for your crops?"
-        else:
-            return f"🌱 **Fertilizer Timing:**\n{SIMPLE_AGRICULTURE_KB['fertilizer']['timing']}\n\nWhat specific crops are you fertilizing? I can provide more targeted advice!"
-    
-    # Check for pest control questions
-    if any(word in query_lower for word in ['pest', 'insect', 'bug', 'disease', 'control']):
-        if 'organic' in query_lower:
-            return f"🐛 **Organic Pest Control:**\n{SIMPLE_AGRICULTURE_KB['pest_control']['organic']}\n\nWhat specific pests are you dealing with? I can suggest targeted organic solutions!"
-        elif 'prevent' in query_lower:
-            return f"🛡️ **Pest Prevention:**\n{SIMPLE_AGRICULTURE_KB['pest_control']['prevention']}\n\nWhat crops are you growing? Prevention strategies vary by crop type!"
-        else:
-            return f"🔬 **Integrated Pest Management:**\n{SIMPLE_AGRICULTURE_KB['pest_control']['ipm']}\n\nAre you dealing with a specific pest problem? Describe the symptoms and affected crops!"
-    
-    # Weather and climate questions
-    if any(word in query_lower for word in ['weather', 'climate', 'temperature', 'rain', 'water']):
-        return "🌤️ **Weather & Agriculture:**\nWeather greatly affects farming success. Monitor temperature, rainfall, and seasonal patterns. Most crops need consistent water but avoid waterlogging. Use weather forecasts for planting and harvesting decisions.\n\nWhat's your local climate like? I can suggest suitable crops!"
-    
-    # Irrigation questions
-    if any(word in query_lower for word in ['water', 'irrigation', 'watering']):
-        return "💧 **Irrigation Guide:**\nProper watering is crucial! Deep, less frequent watering is usually better than shallow, frequent watering. Consider drip irrigation for efficiency. Water early morning or evening to reduce evaporation.\n\nWhat crops are you watering? Each has different water needs!"
-    
-    # Seasonal/timing questions
-    if any(word in query_lower for word in ['when', 'time', 'season', 'plant', 'harvest']):
-        return "📅 **Farming Calendar:**\nTiming depends on your location and crop choice. Generally:\n• **Spring:** Plant warm-season crops after last frost\n• **Summer:** Maintain crops, harvest early varieties\n• **Fall:** Plant cool-season crops, harvest summer crops\n• **Winter:** Plan next year, maintain equipment\n\nWhat's your location and which crops interest you?"
-    
-    # General farming questions
-    if any(word in query_lower for word in ['farm', 'agriculture', 'grow', 'cultivation']):
-        return "🚜 **General Farming Tips:**\nSuccessful farming involves: good soil preparation, choosing right crops for your climate, proper timing, regular monitoring, and continuous learning.\n\n**Key Success Factors:**\n• Know your soil and climate\n• Choose appropriate varieties\n• Practice crop rotation\n• Monitor for pests/diseases\n• Keep detailed records\n\nWhat specific aspect of farming would you like to explore?"
-    
-    # Default engaging response
-    return """🌾 **Welcome to AgriGenius!** 🌾
+    # Swap both references at once; in-flight requests keep the chain they started with
+    with _state_lock:
+        db, chain = new_db, new_chain
+        if answer_cache is not None:
+            # Cached answers were generated from the previous index
+            answer_cache.invalidate()
+        build_status.update(state="ready" if new_chain is not None else "fallback", stage=None,
+                            finished_at=time.time())
 
-I'm here to help with all your farming questions! I can assist with:
+    if new_chain is not None:
+        print("✅ AgriGenius AI system initialized successfully!")
+    else:
+        print("⚠️ AgriGenius running in basic mode - AI features are not available")
 
-🌱 **Crops:** Wheat, Rice, Corn, Tomatoes, and more
-🌍 **Soil:** pH testing, fertility, preparation
-🌿 **Fertilizers:** Organic and synthetic options
-🐛 **Pest Control:** Natural and chemical solutions  
-💧 **Irrigation:** Water management techniques
-📅 **Timing:** When to plant and harvest
+def start_index_build():
+    """Build the index on a daemon thread so the server can take requests right away"""
+    thread = threading.Thread(target=_build_index_in_background, name="index-builder", daemon=True)
+    thread.start()
+    return thread
 
-**Try asking me:**
-• "How do I grow tomatoes?"
-• "What's the best soil pH for wheat?"
-• "How to control pests organically?"
-• "When should I plant corn?"
+# Everything below is loaded on demand
+import_profile.finish()
 
-What farming challenge can I help you solve today? 🚜"""
+# Initialize the components, unless this is a copy of the script imported by a multiprocessing
+# child or forkserver (as __mp_main__); under Gunicorn the module is imported as "app"
+if __name__ != "__mp_main__":
+    print("Starting AgriGenius initialization in the background...")
+    start_index_build()
 
 @app.route('/')
 def index():
@@ -288,120 +247,299 @@ def get_greeting():
         logger.error(f"Error getting greeting: {str(e)}")
         return jsonify({"greeting": "Welcome to AgriGenius!"})
 
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Report index build progress; 503 until the background build has finished"""
+    with _state_lock:
+        status = dict(build_status)
+        status["ai_mode"] = chain is not None
+    status["ready"] = status["state"] in ("ready", "fallback")
+    return jsonify(status), 200 if status["ready"] else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Runtime statistics of the retrieval and caching layers"""
+    data = {"imports": import_profile.stats()}
+    embedding_function = getattr(db, "embedding_function", None)
+    if hasattr(embedding_function, "stats"):
+        data["embeddings"] = embedding_function.stats()
+    if answer_cache is not None:
+        data["answer_cache"] = answer_cache.stats()
+    if response_cache is not None:
+        data["response_cache"] = response_cache.stats()
+    if llm_gateway is not None:
+        data["llm"] = llm_gateway.stats()
+    if is_loaded(context_packer):
+        # Candidate tokens are what the plain 'stuff' prompt would have carried
+        data["context"] = context_packer.stats()
+    if response_catalog is not None:
+        data["response_catalog"] = response_catalog.stats()
+    if intent_classifier is not None:
+        data["intents"] = intent_classifier.stats()
+    if is_loaded(multi_lang):
+        data["translation_cache"] = multi_lang.cache.stats()
+        data["translation"] = multi_lang.translation_stats()
+    return jsonify(data)
+
+def localize(answer, language, enhance=True):
+    """A fixed or knowledge-base answer in `language`, from the response catalog when it has it"""
+    if not multi_lang or language == 'en':
+        return answer
+    if response_catalog is not None:
+        translated = response_catalog.get(answer, language)
+        if translated is not None:
+            return translated
+    if enhance:
+        return multi_lang.enhance_agricultural_translation(answer, language)
+    return multi_lang.translate_text(answer, language, 'en')
+
+def route_query(query, active_chain):
+    """
+    Detect the language and answer questions that don't need the LLM.
+
+    Returns (detected_language, english_query, answer); answer is None when
+    the question should go to the retrieval chain.
+    """
+    # Detect input language automatically
+    detected_language = 'en'
+    if multi_lang:
+        detected_language = multi_lang.detect_language(query)
+        logger.debug(f"Detected language: {detected_language}")
+
+    # Developer questions are recognised in several languages by the intent router
+    if intent_router.route(query).intent == "developer":
+        answer = localize(DEVELOPER_ANSWER, detected_language, enhance=False)
+        return detected_language, query, answer
+
+    # Translate query to English for processing if needed
+    english_query = query
+    if multi_lang and detected_language != 'en':
+        english_query = multi_lang.translate_text(query, 'en', detected_language)
+        logger.debug(f"Translated query: {english_query}")
+
+    if active_chain is None:
+        # Try to get advice from simple knowledge base first
+        if agri_knowledge:
+            knowledge_answer = agri_knowledge.search_advice(english_query)
+            if knowledge_answer:
+                # Translate response back to detected language
+                knowledge_answer = localize(knowledge_answer, detected_language)
+                return detected_language, english_query, knowledge_answer
+
+        # Use smart agriculture response system
+        answer = get_smart_agriculture_response(english_query)
+
+        # Translate response back to detected language
+        answer = localize(answer, detected_language)
+
+        return detected_language, english_query, answer
+
+    if not english_query:
+        answer = localize(EMPTY_QUERY_ANSWER, detected_language, enhance=False)
+        return detected_language, english_query, answer
+
+    # Price, knowledge-base and small-talk questions don't need retrieval and the LLM
+    if intent_classifier is not None:
+        intent, _ = intent_classifier.classify(english_query)
+        answer = None
+        if intent in ("market", "kb") and agri_knowledge:
+            # Only when the knowledge base answers the whole question; anything else goes to the chain
+            answer = agri_knowledge.covered_answer(english_query, intent)
+        elif intent == "meta":
+            route = intent_router.route(english_query)
+            if not (route.crop or route.topics or route.intent):
+                answer = get_smart_agriculture_response(english_query)
+        if answer:
+            intent_classifier.record_bypass()
+            return detected_language, english_query, localize(answer, detected_language)
+
+    return detected_language, english_query, None
+
+def translation_budget():
+    """Block sharing one request's translation time budget between its upstream calls"""
+    return multi_lang.budget() if multi_lang else contextlib.nullcontext()
+
+def translation_degraded():
+    """True when the current request fell back to untranslated text, e.g. while the service is down"""
+    return is_loaded(multi_lang) and multi_lang.degraded()
+
+def answer_query(query, active_db, active_chain):
+    """
+    Build the /ask response for one question with the given index and chain.
+    The "degraded" key marks a response that must not be cached.
+    """
+    with translation_budget():
+        detected_language, english_query, answer = route_query(query, active_chain)
+        if answer is None:
+            answer = "".join(stream_chain_answer(english_query, active_db, active_chain, detected_language, stream=False))
+        degraded = translation_degraded()
+    return {
+        "answer": answer,
+        "detectedLanguage": detected_language,
+        "degraded": degraded
+    }
+
+def _translated_sentences(pieces, language):
+    """
+    Translate streamed English text as soon as a line, or a sentence within
+    a long line, is complete. Each piece goes through the same segment-wise
+    translation as /ask, so line breaks, bullets and list numbers come out
+    as they went in.
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        cut = buffer.rfind("\n") + 1
+        if not cut:
+            ends = list(_SENTENCE_END_RE.finditer(buffer))
+            cut = ends[-1].end() if ends else 0
+        if cut:
+            yield multi_lang.enhance_agricultural_translation(buffer[:cut], language)
+            buffer = buffer[cut:]
+    if buffer:
+        yield multi_lang.enhance_agricultural_translation(buffer, language)
+
+def stream_chain_answer(english_query, active_db, active_chain, detected_language, stream=True):
+    """Yield the chain's answer in the user's language, piece by piece as the LLM produces it"""
+    # Reuse the answer of a near-identical earlier question if there is one
+    query_vector = None
+    embedding_function = getattr(active_db, "embedding_function", None)
+    if answer_cache is not None and embedding_function is not None:
+        with _state_lock:
+            # Answers from a chain that has been swapped out since this request began are not kept
+            generation = answer_cache.generation if active_chain is chain else None
+        query_vector = embedding_function.embed_query(english_query)
+        answer = answer_cache.get(query_vector)
+        if answer is not None:
+            if multi_lang and detected_language != 'en':
+                answer = multi_lang.enhance_agricultural_translation(answer, detected_language)
+            yield answer
+            return
+
+    started = time.perf_counter()
+    english_parts = []
+
+    def generate():
+        # Retrieval reuses the query vector computed for the answer cache above
+        known_vector = getattr(active_db, "known_query_vector", None)
+        with known_vector(english_query, query_vector) if known_vector and query_vector is not None else contextlib.nullcontext():
+            # Process the query with the AI model
+            if stream and stream_retrieval_qa is not None:
+                pieces = stream_retrieval_qa(active_chain, english_query)
+            else:
+                pieces = [active_chain(english_query)['result']]
+            for piece in pieces:
+                english_parts.append(piece)
+                yield piece
+
+    # Translate response back to detected language, a sentence at a time when streaming
+    if multi_lang and detected_language != 'en':
+        if stream:
+            yield from _translated_sentences(generate(), detected_language)
+        else:
+            yield multi_lang.enhance_agricultural_translation("".join(generate()), detected_language)
+    else:
+        yield from generate()
+
+    answer = "".join(english_parts)
+    if query_vector is not None and answer and generation is not None:
+        answer_cache.put(query_vector, answer, time.perf_counter() - started, generation=generation)
+
+def stream_query(query, active_db, active_chain):
+    """Yield (event, data) pairs for one question: meta, then tokens, then done"""
+    with translation_budget():
+        detected_language, english_query, answer = route_query(query, active_chain)
+        yield "meta", {"detectedLanguage": detected_language}
+        if answer is None:
+            parts = []
+            for piece in stream_chain_answer(english_query, active_db, active_chain, detected_language):
+                parts.append(piece)
+                yield "token", piece
+            answer = "".join(parts)
+        else:
+            yield "token", answer
+        yield "done", {"answer": answer, "detectedLanguage": detected_language, "degraded": translation_degraded()}
+
+def error_response(message_text):
+    """Apology for a failed request, in the language of the question when it can be detected"""
+    answer = ERROR_ANSWER
+    
+    # Try to detect language and translate error message
+    detected_language = 'en'
+    if multi_lang and message_text:
+        try:
+            detected_language = multi_lang.detect_language(message_text)
+            answer = localize(answer, detected_language, enhance=False)
+        except:
+            pass
+    return {
+        "answer": answer,
+        "detectedLanguage": detected_language
+    }
+
+def _index_version(active_db, active_chain):
+    return getattr(active_db, "index_version", None) if active_chain is not None else "fallback"
+
 @app.route('/ask', methods=['POST'])
 def ask():
+    # Take one reference for the whole request so a hot-swap can't change it midway
+    with _state_lock:
+        active_db, active_chain = db, chain
     try:
         query = request.form['messageText'].strip()
-        
-        # Detect input language automatically
-        detected_language = 'en'
-        if multi_lang:
-            detected_language = multi_lang.detect_language(query)
-            print(f"Detected language: {detected_language}")
-        
-        # Handle developer questions in multiple languages
-        developer_questions = {
-            'en': ["who developed you?", "who created you?", "who made you?"],
-            'hi': ["आपको किसने बनाया?", "आपका डेवलपर कौन है?", "तुम्हें किसने बनाया है?"],
-            'es': ["¿quién te desarrolló?", "¿quién te creó?", "¿quién te hizo?"],
-            'fr': ["qui t'a développé?", "qui t'a créé?", "qui t'a fait?"],
-            'de': ["wer hat dich entwickelt?", "wer hat dich geschaffen?", "wer hat dich gemacht?"],
-            'ar': ["من طورك؟", "من خلقك؟", "من صنعك؟"],
-            'bn': ["কে তোমাকে তৈরি করেছে?", "তোমার ডেভেলপার কে?"],
-            'ta': ["உன்னை யார் உருவாக்கினார்கள்?", "உன்னை யார் உருவாக்கியது?"],
-            'te': ["మిమ్మల్ని ఎవరు అభివృద్ధి చేశారు?", "మిమ్మల్ని ఎవరు సృష్టించారు?"]
-        }
-        
-        # Check if it's a developer question
-        is_developer_question = False
-        for lang_questions in developer_questions.values():
-            if any(q in query.lower() for q in lang_questions):
-                is_developer_question = True
-                break
-        
-        if is_developer_question:
-            answer = "I was developed by Jayesh Bhandarkar."
-            if multi_lang and detected_language != 'en':
-                answer = multi_lang.translate_text(answer, detected_language, 'en')
-            return jsonify({
-                "answer": answer,
-                "detectedLanguage": detected_language
-            })
-        
-        # Translate query to English for processing if needed
-        english_query = query
-        if multi_lang and detected_language != 'en':
-            english_query = multi_lang.translate_text(query, 'en', detected_language)
-            print(f"Translated query: {english_query}")
-        
-        if chain is None:
-            # Try to get advice from simple knowledge base first
-            if agri_knowledge:
-                knowledge_answer = agri_knowledge.search_advice(english_query)
-                if knowledge_answer:
-                    # Translate response back to detected language
-                    if multi_lang and detected_language != 'en':
-                        knowledge_answer = multi_lang.enhance_agricultural_translation(knowledge_answer, detected_language)
-                    return jsonify({
-                        "answer": knowledge_answer,
-                        "detectedLanguage": detected_language
-                    })
-            
-            # Use smart agriculture response system
-            answer = get_smart_agriculture_response(english_query)
-            
-            # Translate response back to detected language
-            if multi_lang and detected_language != 'en':
-                answer = multi_lang.enhance_agricultural_translation(answer, detected_language)
-            
-            return jsonify({
-                "answer": answer,
-                "detectedLanguage": detected_language
-            })
-        
-        if not english_query:
-            answer = "Please enter a question."
-            if multi_lang and detected_language != 'en':
-                answer = multi_lang.translate_text(answer, detected_language, 'en')
-            return jsonify({
-                "answer": answer,
-                "detectedLanguage": detected_language
-            })
-        
-        # Process the query with the AI model
-        response = chain(english_query)
-        answer = response['result']
-        
-        # Translate response back to detected language
-        if multi_lang and detected_language != 'en':
-            answer = multi_lang.enhance_agricultural_translation(answer, detected_language)
-        
-        return jsonify({
-            "answer": answer,
-            "detectedLanguage": detected_language
-        })
+        if response_cache is None or not query:
+            response = answer_query(query, active_db, active_chain)
+        else:
+            # Repeated questions, from any worker, share one computation; answers left
+            # untranslated because the translation service was unavailable are not kept
+            index_version = _index_version(active_db, active_chain)
+            response = response_cache.get_or_compute(
+                query, index_version, lambda: answer_query(query, active_db, active_chain),
+                cacheable=lambda value: not value["degraded"]
+            )
+        response.pop("degraded", None)
+        return jsonify(response)
         
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
-        answer = "I apologize, but I'm experiencing technical difficulties. Please try asking your agriculture question again, or consult with local farming experts for immediate assistance."
-        
-        # Try to detect language and translate error message
-        detected_language = 'en'
-        if multi_lang and 'messageText' in request.form:
-            try:
-                detected_language = multi_lang.detect_language(request.form['messageText'])
-                if detected_language != 'en':
-                    answer = multi_lang.translate_text(answer, detected_language, 'en')
-            except:
-                pass
-            
-        return jsonify({
-            "answer": answer,
-            "detectedLanguage": detected_language
-        })
+        return jsonify(error_response(request.form.get('messageText')))
+
+def _sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/ask/stream', methods=['POST'])
+def ask_stream():
+    """Like /ask, but streams the answer as Server-Sent Events while the LLM generates it"""
+    with _state_lock:
+        active_db, active_chain = db, chain
+    query = request.form.get('messageText', '').strip()
+    index_version = _index_version(active_db, active_chain)
+
+    def generate():
+        try:
+            cached = response_cache.get(query, index_version) if response_cache is not None and query else None
+            if cached is not None:
+                cached.pop("degraded", None)
+                yield _sse("meta", {"detectedLanguage": cached["detectedLanguage"]})
+                yield _sse("token", cached["answer"])
+                yield _sse("done", cached)
+                return
+            for event, data in stream_query(query, active_db, active_chain):
+                if event == "done":
+                    degraded = data.pop("degraded")
+                    if response_cache is not None and query and not degraded:
+                        response_cache.put(query, index_version, data)
+                yield _sse(event, data)
+        except Exception as e:
+            logger.error(f"Error streaming query: {str(e)}")
+            yield _sse("error", error_response(query))
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 if __name__ == "__main__":
     # Always run the app, even if chain initialization failed
     logger.info("Starting AgriGenius application...")
-    print(f"🚀 AgriGenius running in {'AI' if AI_MODE and chain else 'Enhanced Fallback'} mode")
+    print("🚀 AgriGenius running in Enhanced Fallback mode until the AI index is ready")
     app.run(debug=True, host='127.0.0.1', port=5000)
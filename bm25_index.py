@@ -0,0 +1,279 @@
+"""
+BM25 Lexical Index
+Inverted index used to shortlist chunks before dense scoring, fused with reciprocal rank
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from array import array
+from contextlib import contextmanager
+from typing import Any, Optional
+
+import numpy as np
+
+from numpy_store import Document, BaseRetriever
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Most lexical candidates that go on to dense scoring
+SHORTLIST_SIZE = 200
+# Reciprocal rank fusion constant from Cormack et al.
+RRF_K = 60
+
+_TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it me my of on or should
+so than that the their them there these this to was what when where which who why
+will with you your we our best good about into much many more most
+""".split())
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords"""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+class BM25Index:
+    """
+    Incremental inverted index over chunk ids.
+
+    Postings are compact array('I')/array('H') pairs per term, and deleted
+    chunks are tombstoned until the next save. Scoring only touches the
+    postings of the query terms, so its cost grows with the number of
+    matching chunks rather than with the corpus.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self._doc_of = {}
+        self._lengths = array("I")
+        self._live = array("B")
+        self._postings = {}
+        self._total_length = 0
+        # Set by adds and removals; save() is a no-op while the index matches what is on disk
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._doc_of)
+
+    def add(self, ids, texts):
+        for doc_id, text in zip(ids, texts):
+            if doc_id in self._doc_of:
+                self.remove([doc_id])
+            tokens = tokenize(text)
+            doc = len(self.ids)
+            self.ids.append(doc_id)
+            self._doc_of[doc_id] = doc
+            self._lengths.append(len(tokens))
+            self._live.append(1)
+            self._total_length += len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                docs, tfs = self._postings.setdefault(token, (array("I"), array("H")))
+                docs.append(doc)
+                tfs.append(min(count, 65535))
+            self.dirty = True
+
+    def remove(self, ids):
+        for doc_id in ids:
+            doc = self._doc_of.pop(doc_id, None)
+            if doc is not None:
+                self._live[doc] = 0
+                self._total_length -= self._lengths[doc]
+                self.dirty = True
+
+    def search(self, query, limit=SHORTLIST_SIZE):
+        """Return [(chunk_id, bm25_score)] for the best matching chunks, best first"""
+        terms = set(tokenize(query))
+        if not terms or not self._doc_of:
+            return []
+        live_count = len(self._doc_of)
+        avg_length = self._total_length / live_count if live_count else 1.0
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32)
+        live = np.frombuffer(self._live, dtype=np.uint8).astype(bool)
+
+        doc_parts, score_parts = [], []
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            docs = np.frombuffer(postings[0], dtype=np.uint32)
+            tfs = np.frombuffer(postings[1], dtype=np.uint16).astype(np.float32)
+            keep = live[docs]
+            docs, tfs = docs[keep], tfs[keep]
+            if not len(docs):
+                continue
+            idf = np.log(1 + (live_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * lengths[docs] / avg_length)
+            doc_parts.append(docs)
+            score_parts.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+        if not doc_parts:
+            return []
+
+        docs, inverse = np.unique(np.concatenate(doc_parts), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(score_parts))
+        top = np.argsort(-scores)[:limit]
+        return [(self.ids[docs[i]], float(scores[i])) for i in top]
+
+    def save(self, directory):
+        """Write the index to `directory`, dropping deleted chunks; skipped when nothing changed"""
+        if not self.dirty:
+            return
+        os.makedirs(directory, exist_ok=True)
+        remap = np.full(len(self.ids), -1, dtype=np.int64)
+        live_docs = [doc for doc in range(len(self.ids)) if self._live[doc]]
+        remap[live_docs] = np.arange(len(live_docs))
+
+        terms, offsets, all_docs, all_tfs = [], [0], [], []
+        for term, (docs, tfs) in self._postings.items():
+            docs = np.frombuffer(docs, dtype=np.uint32)
+            keep = remap[docs] >= 0
+            if not keep.any():
+                continue
+            terms.append(term)
+            all_docs.append(remap[docs[keep]].astype(np.uint32))
+            all_tfs.append(np.frombuffer(tfs, dtype=np.uint16)[keep])
+            offsets.append(offsets[-1] + int(keep.sum()))
+
+        arrays = {
+            "offsets.npy": np.asarray(offsets, dtype=np.int64),
+            "docs.npy": np.concatenate(all_docs) if all_docs else np.zeros(0, np.uint32),
+            "tfs.npy": np.concatenate(all_tfs) if all_tfs else np.zeros(0, np.uint16),
+            "lengths.npy": np.asarray([self._lengths[doc] for doc in live_docs], dtype=np.uint32)
+        }
+        for name, values in arrays.items():
+            tmp_path = os.path.join(directory, name + ".tmp")
+            with open(tmp_path, "wb") as file:
+                np.save(file, values)
+            os.replace(tmp_path, os.path.join(directory, name))
+        tmp_path = os.path.join(directory, "terms.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"terms": terms, "ids": [self.ids[doc] for doc in live_docs]}, file)
+        os.replace(tmp_path, os.path.join(directory, "terms.json"))
+        self.dirty = False
+
+    @classmethod
+    def load(cls, directory, k1=BM25_K1, b=BM25_B):
+        """Load a saved index, or return an empty one if none exists"""
+        index = cls(k1, b)
+        try:
+            with open(os.path.join(directory, "terms.json"), "r", encoding="utf-8") as file:
+                saved = json.load(file)
+        except FileNotFoundError:
+            return index
+        offsets = np.load(os.path.join(directory, "offsets.npy"))
+        docs = np.load(os.path.join(directory, "docs.npy"))
+        tfs = np.load(os.path.join(directory, "tfs.npy"))
+        lengths = np.load(os.path.join(directory, "lengths.npy"))
+
+        index.ids = saved["ids"]
+        index._doc_of = {doc_id: doc for doc, doc_id in enumerate(index.ids)}
+        index._lengths = array("I", lengths.astype(np.uint32).tobytes())
+        index._live = array("B", bytes([1]) * len(index.ids))
+        index._total_length = int(lengths.sum())
+        for i, term in enumerate(saved["terms"]):
+            start, stop = offsets[i], offsets[i + 1]
+            index._postings[term] = (array("I", docs[start:stop].tobytes()), array("H", tfs[start:stop].tobytes()))
+        logger.info(f"Loaded BM25 index with {len(index)} chunks and {len(index._postings)} terms")
+        return index
+
+def reciprocal_rank_fusion(*rankings, k=RRF_K):
+    """Fuse ranked id lists into one list of (id, score), best first"""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+class HybridVectorStore:
+    """
+    Vector store wrapper that answers queries lexical-first.
+
+    BM25 shortlists the chunks sharing terms with the query, only those are
+    scored densely, and the two rankings are fused with RRF. Queries with no
+    lexical match fall back to a normal dense search of the whole store.
+    Everything else is delegated to the wrapped store.
+    """
+
+    def __init__(self, store, lexical, embedding_function, shortlist_size=SHORTLIST_SIZE, index_version=None):
+        self.store = store
+        self.lexical = lexical
+        self.embedding_function = embedding_function
+        self.shortlist_size = shortlist_size
+        # Identifies the indexed content, e.g. for keying cached responses
+        self.index_version = index_version
+        self._known = threading.local()
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    @contextmanager
+    def known_query_vector(self, query, vector):
+        """
+        Let searches for `query` made by this thread inside the block use
+        `vector` instead of embedding the query again, e.g. when the caller
+        already embedded it to look up the answer cache.
+        """
+        previous = getattr(self._known, "vector", None)
+        self._known.vector = (query, np.asarray(vector, dtype=np.float32))
+        try:
+            yield
+        finally:
+            self._known.vector = previous
+
+    def _embed_query(self, query):
+        known = getattr(self._known, "vector", None)
+        if known is not None and known[0] == query:
+            return known[1]
+        return np.asarray(self.embedding_function.embed_query(query), dtype=np.float32)
+
+    def _dense_shortlist(self, query, ids):
+        """Dense (Document, score) pairs for `ids` only, best first"""
+        query_vector = self._embed_query(query)
+        if hasattr(self.store, "search_ids"):
+            return self.store.search_ids(query_vector, ids)
+        found = self.store.get(ids=list(ids), include=["embeddings", "documents", "metadatas"])
+        if not found["ids"]:
+            return []
+        scores = np.asarray(found["embeddings"], dtype=np.float32) @ query_vector
+        order = np.argsort(-scores)
+        return [(Document(page_content=found["documents"][i], metadata=dict(found["metadatas"][i] or {}, id=found["ids"][i])),
+                 float(scores[i])) for i in order]
+
+    def hybrid_search(self, query, k=4, score_threshold=None):
+        shortlist = self.lexical.search(query, limit=self.shortlist_size)
+        if not shortlist:
+            if hasattr(self.store, "similarity_search_by_vector_with_score"):
+                found = self.store.similarity_search_by_vector_with_score(self._embed_query(query), k=k)
+            else:
+                found = self.store.similarity_search_with_relevance_scores(query, k=k)
+            return [doc for doc, score in found if score_threshold is None or score >= score_threshold]
+
+        dense = [(doc, score) for doc, score in self._dense_shortlist(query, [doc_id for doc_id, _ in shortlist])
+                 if score_threshold is None or score >= score_threshold]
+        by_id = {doc.metadata["id"]: doc for doc, _ in dense}
+        fused = reciprocal_rank_fusion([doc_id for doc_id, _ in shortlist if doc_id in by_id], list(by_id))
+        return [by_id[doc_id] for doc_id, _ in fused[:k]]
+
+    def as_retriever(self, search_kwargs=None, **kwargs):
+        search_kwargs = dict(search_kwargs or {})
+        return HybridRetriever(store=self, k=search_kwargs.get("k", 4),
+                               score_threshold=search_kwargs.get("score_threshold"))
+
+class HybridRetriever(BaseRetriever):
+    """LangChain retriever over a HybridVectorStore"""
+
+    store: Any
+    k: int = 4
+    score_threshold: Optional[float] = None
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.store.hybrid_search(query, k=self.k, score_threshold=self.score_threshold)
@@ -1,7 +1,19 @@
-import requests
-import PyPDF2
-from itertools import chain
+import os
+import json
+import shutil
+import hashlib
+from contextlib import contextmanager
 import logging
+from pdf_extractor import iter_pdf_pages
+from ingest_pipeline import ingest_chunks
+from web_fetcher import fetch_websites
+from dedup import NearDuplicateFilter, DEDUP_THRESHOLD
+
+try:
+    import fcntl
+except ImportError:
+    # Not on Windows; builds there are not serialized across processes
+    fcntl = None
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -12,6 +24,9 @@ try:
     from langchain_community.vectorstores import Chroma
     from langchain.text_splitter import RecursiveCharacterTextSplitter
     from langchain_community.embeddings import HuggingFaceEmbeddings
+    from embedding_cache import CachedEmbeddings, ListEmbeddings
+    from numpy_store import NumpyVectorStore, VECTOR_DTYPE
+    from bm25_index import BM25Index, HybridVectorStore
     AI_PACKAGES_AVAILABLE = True
     logger.info("AI packages loaded successfully")
 except ImportError as e:
@@ -31,25 +46,27 @@ except ImportError as e:
         def __init__(self, *args, **kwargs):
             pass
 
+# Persistent index settings; changing the model or chunking forces a full rebuild
+INDEX_DIRECTORY = os.getenv("AGRI_INDEX_DIR", "vector_index")
+MANIFEST_FILE = "manifest.json"
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+CHUNK_SIZE = 200
+CHUNK_OVERLAP = 20
+# "chroma", or "numpy" for the in-process quantized store stored as VECTOR_DTYPE (see numpy_store.py)
+VECTOR_BACKEND = os.getenv("AGRI_VECTOR_BACKEND", "chroma")
+
 # Function to fetch content from a website
 def fetch_website_content(url):
-    try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        return response.text
-    except requests.RequestException as e:
-        logger.error(f"Error fetching content from {url}: {str(e)}")
-        return ""
+    return fetch_websites([url]).get(url, "")
+
+# Function to stream the text of a PDF file page by page
+def extract_pdf_pages(pdf_file, workers=None):
+    return iter_pdf_pages(pdf_file, workers=workers)
 
 # Function to extract text from a PDF file
 def extract_pdf_text(pdf_file):
     try:
-        with open(pdf_file, "rb") as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page_num in range(len(pdf_reader.pages)):
-                text += pdf_reader.pages[page_num].extract_text()
-        return text
+        return "".join(iter_pdf_pages(pdf_file))
     except Exception as e:
         logger.error(f"Error extracting text from {pdf_file}: {str(e)}")
         return ""
@@ -60,19 +77,258 @@ def split_text(text, chunk_size=500, chunk_overlap=100):
     chunks = text_splitter.split_text(text)
     return chunks
 
-# Initialize embeddings and vector store
+# Split a stream of text pieces (e.g. PDF pages) into chunks without joining them all
+def split_text_stream(pieces, chunk_size=500, chunk_overlap=100, window=8):
+    if isinstance(pieces, str):
+        pieces = [pieces]
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) < chunk_size * window:
+            continue
+        chunks = text_splitter.split_text(buffer)
+        # Hold back the last chunk so text running across a page break stays together
+        yield from chunks[:-1]
+        buffer = chunks[-1] if chunks else ""
+    if buffer.strip():
+        yield from text_splitter.split_text(buffer)
+
+# Hash text or bytes so unchanged sources can be recognised across restarts
+def content_hash(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+# Hash a file in blocks without reading it into memory
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_embedding_function():
+    # Use a simpler, more memory-efficient embedding model
+    def load_model():
+        return HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': True, 'batch_size': 8}  # Smaller batch size
+        )
+
+    # Chunks already embedded by any earlier build or worker are read from the cache
+    return CachedEmbeddings(load_model, f"{EMBEDDING_MODEL}-normalized")
+
+def _index_settings():
+    return {
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "id_scheme": 2,
+        "dedup_threshold": DEDUP_THRESHOLD,
+        "dedup_scope": "source",
+        "lexical_index": "bm25-1",
+        "vector_backend": VECTOR_BACKEND if VECTOR_BACKEND != "numpy" else f"numpy-{VECTOR_DTYPE}",
+    }
+
+def load_manifest(persist_directory=INDEX_DIRECTORY):
+    """Read the source manifest of an on-disk index, or None if there is none"""
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable index manifest {path}: {e}")
+        return None
+
+def save_manifest(manifest, persist_directory=INDEX_DIRECTORY):
+    """Write the manifest atomically so a crash never leaves a half-written file"""
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _chunk_ids(source_id, digest, start, stop):
+    prefix = content_hash(f"{source_id}\n{digest}")[:16]
+    return [f"{prefix}-{i}" for i in range(start, stop)]
+
+def _log_dedup_stats(filters):
+    seen = sum(f.seen for f in filters)
+    removed = sum(f.removed for f in filters)
+    if seen:
+        logger.info(f"Deduplication removed {removed} of {seen} chunks "
+                    f"({removed / seen:.1%}) at similarity {DEDUP_THRESHOLD}")
+
+def _delete_chunks(db, lexical, ids):
+    db.delete(ids=ids)
+    lexical.remove(ids)
+
+# Stream chunks of one source into the vector and BM25 indexes through the batched pipeline
+def _ingest_source(db, lexical, source_id, digest, pieces, dedup=None):
+    added = [0]
+
+    def add_batch(start, batch):
+        ids = _chunk_ids(source_id, digest, start, start + len(batch))
+        db.add_texts(batch, metadatas=[{"source": source_id, "id": i} for i in ids], ids=ids)
+        lexical.add(ids, batch)
+        added[0] = start + len(batch)
+
+    chunks = (c for c in split_text_stream(pieces, CHUNK_SIZE, CHUNK_OVERLAP) if c.strip())
+    if dedup is not None:
+        chunks = dedup.filter(chunks)
+    try:
+        return ingest_chunks(add_batch, chunks)
+    except Exception:
+        # Drop the partial upload so the index matches the manifest again
+        if added[0]:
+            _delete_chunks(db, lexical, _chunk_ids(source_id, digest, 0, added[0]))
+        raise
+    finally:
+        # A page generator left suspended would keep its PDF worker pool alive
+        if hasattr(pieces, "close"):
+            pieces.close()
+
+@contextmanager
+def index_lock(persist_directory=INDEX_DIRECTORY):
+    """
+    Hold an exclusive lock on an index for the duration of a sync.
+
+    Every worker syncs the same directory at startup; the first one to get
+    the lock does the work, the rest wait and then find the manifest up to
+    date. The lock file sits next to the directory because a settings change
+    removes the directory itself.
+    """
+    if fcntl is None:
+        yield
+        return
+    lock_path = os.path.normpath(persist_directory) + ".lock"
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.info(f"Waiting for another process to finish syncing {persist_directory}")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def sync_vector_store(sources, persist_directory=INDEX_DIRECTORY, progress=None):
+    """
+    Open the persistent index and re-embed only the sources whose content changed.
+
+    `sources` is a list of (source_id, digest, load_text) tuples. `load_text`
+    returns the text, or an iterable of text pieces such as PDF pages, and is
+    only called when the digest differs from the manifest, so unchanged PDFs
+    are never re-extracted. A digest of None means the source is temporarily
+    unavailable and whatever is already indexed for it is kept.
+    `progress(done, total)` is called after each source. Concurrent syncs
+    of the same directory, from other threads or worker processes, run one
+    after the other.
+    """
+    if not AI_PACKAGES_AVAILABLE:
+        logger.warning("AI packages not available, skipping vector store initialization")
+        return None
+
+    with index_lock(persist_directory):
+        return _sync_vector_store(sources, persist_directory, progress)
+
+def _sync_vector_store(sources, persist_directory, progress):
+    try:
+        manifest = load_manifest(persist_directory)
+        if manifest is not None and manifest.get("settings") != _index_settings():
+            logger.info("Index settings changed, rebuilding vector index from scratch")
+            shutil.rmtree(persist_directory, ignore_errors=True)
+            manifest = None
+        if manifest is None:
+            manifest = {"settings": _index_settings(), "sources": {}}
+
+        embedding_function = get_embedding_function()
+        if VECTOR_BACKEND == "numpy":
+            numpy_directory = os.path.join(persist_directory, "numpy")
+            db = NumpyVectorStore.load(numpy_directory, embedding_function)
+        else:
+            db = Chroma(
+                collection_name="agrigenius",
+                embedding_function=ListEmbeddings(embedding_function),
+                persist_directory=persist_directory
+            )
+        lexical_directory = os.path.join(persist_directory, "bm25")
+        lexical = BM25Index.load(lexical_directory)
+
+        indexed = manifest["sources"]
+        wanted = {source_id for source_id, _, _ in sources}
+        # One filter per source: a chunk is only ever dropped in favour of a copy in the same
+        # source, so re-ingesting or removing one source never leaves another one incomplete
+        filters = []
+        reused = 0
+        for done, (source_id, digest, load_text) in enumerate(sources):
+            if progress:
+                progress(done, len(sources))
+            entry = indexed.get(source_id)
+            if digest is None or (entry and entry["digest"] == digest):
+                reused += 1
+                continue
+
+            dedup = NearDuplicateFilter()
+            filters.append(dedup)
+            try:
+                stats = _ingest_source(db, lexical, source_id, digest, load_text() or "", dedup)
+            except Exception as e:
+                logger.warning(f"Failed to load {source_id}, keeping its previous chunks: {str(e)}")
+                continue
+
+            # New chunks are in place, now retire the previous version of the source
+            if entry:
+                _delete_chunks(db, lexical, _chunk_ids(source_id, entry["digest"], 0, entry["chunks"]))
+            indexed[source_id] = {"digest": digest, "chunks": stats["chunks"]}
+            logger.info(f"Indexed {stats['chunks']} chunks from {source_id}")
+
+        if progress:
+            progress(len(sources), len(sources))
+
+        for source_id in [s for s in indexed if s not in wanted]:
+            entry = indexed.pop(source_id)
+            _delete_chunks(db, lexical, _chunk_ids(source_id, entry["digest"], 0, entry["chunks"]))
+            logger.info(f"Removed {source_id} from vector index")
+
+        # The manifest goes last; if the build is interrupted before this, the next run
+        # redoes the changed sources (cheaply, from the embedding cache) with the same ids
+        if VECTOR_BACKEND == "numpy":
+            db.save(numpy_directory)
+        lexical.save(lexical_directory)
+        save_manifest(manifest, persist_directory)
+        _log_dedup_stats(filters)
+        cache_stats = embedding_function.cache.stats()
+        if cache_stats["hits"] or cache_stats["misses"]:
+            logger.info(f"Embedding cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+        logger.info(f"Vector index ready: {reused} sources reused, "
+                    f"{sum(e['chunks'] for e in indexed.values())} chunks total")
+
+        if not any(e["chunks"] for e in indexed.values()):
+            logger.warning("No chunks generated from content")
+            return None
+        # Changes whenever any source or setting does, so cached responses can be keyed on it
+        index_version = content_hash(json.dumps(manifest, sort_keys=True))[:16]
+        return HybridVectorStore(db, lexical, embedding_function, index_version=index_version)
+    except Exception as e:
+        logger.error(f"Error loading persistent vector store: {str(e)}")
+        return None
+
+# Initialize embeddings and an in-memory vector store
 def initialize_vector_store(contents):
     if not AI_PACKAGES_AVAILABLE:
         logger.warning("AI packages not available, skipping vector store initialization")
         return None
         
     try:
-        # Use a simpler, more memory-efficient embedding model
-        embedding_function = HuggingFaceEmbeddings(
-            model_name="all-MiniLM-L6-v2",
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True, 'batch_size': 8}  # Smaller batch size
-        )
+        embedding_function = get_embedding_function()
         
         # Filter out empty contents
         valid_contents = [content for content in contents if content.strip()]
@@ -80,21 +336,23 @@ def initialize_vector_store(contents):
             logger.warning("No valid content found to initialize vector store")
             return None
         
-        web_chunks = []
-        for content in valid_contents:
-            chunks = split_text(content, chunk_size=200, chunk_overlap=20)  # Much smaller chunks
-            web_chunks.extend(chunks[:20])  # Limit to first 20 chunks per content
-        
-        if not web_chunks:
+        db = Chroma(collection_name="agrigenius", embedding_function=ListEmbeddings(embedding_function))
+        lexical = BM25Index()
+        filters = []
+        total = 0
+        for i, content in enumerate(valid_contents):
+            filters.append(NearDuplicateFilter())
+            stats = _ingest_source(db, lexical, f"content-{i}", content_hash(content), content, filters[-1])
+            total += stats["chunks"]
+        _log_dedup_stats(filters)
+
+        if not total:
             logger.warning("No chunks generated from content")
             return None
-        
-        # Limit total chunks to avoid memory issues
-        web_chunks = web_chunks[:50]  # Process only first 50 chunks total
-        logger.info(f"Processing {len(web_chunks)} text chunks")
-            
-        db = Chroma.from_texts(web_chunks, embedding_function)
-        return db
+
+        logger.info(f"Processed {total} text chunks")
+        index_version = content_hash("\0".join(valid_contents))[:16]
+        return HybridVectorStore(db, lexical, embedding_function, index_version=index_version)
     except Exception as e:
         logger.error(f"Error initializing vector store: {str(e)}")
         return None
@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
 import logging
+from llm_gateway import LLMGateway, GatewayLLM
+from context_packer import PackedRetriever, context_packer, CONTEXT_CANDIDATES
 
 # Load environment variables
 load_dotenv()
@@ -11,7 +13,6 @@ logger = logging.getLogger(__name__)
 
 # Try to import AI packages, continue without them if they fail
 try:
-    from langchain_together import Together
     from langchain.chains import RetrievalQA
     from langchain.prompts import PromptTemplate
     AI_PACKAGES_AVAILABLE = True
@@ -20,9 +21,6 @@ except ImportError as e:
     logger.warning(f"LangChain packages not available: {e}")
     AI_PACKAGES_AVAILABLE = False
     # Create dummy classes
-    class Together:
-        def __init__(self, *args, **kwargs):
-            pass
     class RetrievalQA:
         @staticmethod
         def from_chain_type(*args, **kwargs):
@@ -31,16 +29,28 @@ except ImportError as e:
         def __init__(self, *args, **kwargs):
             pass
 
+# Generation settings for every completion request
+LLM_SETTINGS = {
+    "model": "meta-llama/Llama-2-70b-chat-hf",
+    "max_tokens": 512,
+    "temperature": 0.1,
+    "top_k": 1
+}
+TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY", "YOUR_Together_API_KEY")
+
+# Define the prompt template
+prompt_template = """ Your name is AgriGenius, Please answer questions related to Agriculture. Try explaining in simple words. Answer in less than 100 words. If you don't know the answer, simply respond with 'Don't know.'
+         CONTEXT: {context}
+         QUESTION: {question}"""
+QA_TEMPLATE = f"[INST] {prompt_template} [/INST]"
+
+# All LLM calls share one pooled, concurrency-limited client (see llm_gateway.py)
+llm_gateway = LLMGateway(LLM_SETTINGS, TOGETHER_API_KEY)
+
 # Initialize the language model
 if AI_PACKAGES_AVAILABLE:
     try:
-        llm = Together(
-            model="meta-llama/Llama-2-70b-chat-hf",
-            max_tokens=512,
-            temperature=0.1,
-            top_k=1,
-            together_api_key=os.getenv("TOGETHER_API_KEY", "YOUR_Together_API_KEY")
-        )
+        llm = GatewayLLM(gateway=llm_gateway)
         logger.info("Together AI LLM initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize Together AI: {e}")
@@ -58,14 +68,13 @@ def setup_retrieval_qa(db):
         if db is None:
             raise ValueError("Database is None")
             
-        retriever = db.as_retriever(similarity_score_threshold=0.6)
-
-        # Define the prompt template
-        prompt_template = """ Your name is AgriGenius, Please answer questions related to Agriculture. Try explaining in simple words. Answer in less than 100 words. If you don't know the answer, simply respond with 'Don't know.'
-         CONTEXT: {context}
-         QUESTION: {question}"""
+        # Retrieve a few extra candidates and send only what fits the context token budget
+        retriever = PackedRetriever(
+            retriever=db.as_retriever(similarity_score_threshold=0.6, search_kwargs={"k": CONTEXT_CANDIDATES}),
+            packer=context_packer
+        )
 
-        PROMPT = PromptTemplate(template=f"[INST] {prompt_template} [/INST]", input_variables=["context", "question"])
+        PROMPT = PromptTemplate(template=QA_TEMPLATE, input_variables=["context", "question"])
 
         # Initialize the RetrievalQA chain
         chain = RetrievalQA.from_chain_type(
@@ -81,3 +90,10 @@ def setup_retrieval_qa(db):
     except Exception as e:
         logger.error(f"Error setting up retrieval QA: {str(e)}")
         return None
+
+def stream_retrieval_qa(chain, query):
+    """Answer `query` like the RetrievalQA chain does, yielding the answer as it is generated"""
+    docs = chain.retriever.invoke(query)
+    # Same context layout as the 'stuff' chain; the retriever has already packed it
+    context = "\n\n".join(doc.page_content for doc in docs)
+    yield from llm_gateway.stream(QA_TEMPLATE.format(context=context, question=query))
@@ -0,0 +1,140 @@
+"""
+Circuit Breaker
+Deadline-bounded calls to a flaky upstream that fail fast while it is down
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+class CircuitOpenError(Exception):
+    """The upstream is considered down; the call was not attempted"""
+
+class CallTimeoutError(Exception):
+    """The upstream did not answer within the call's timeout"""
+
+class CircuitBreaker:
+    """
+    Guards calls to one upstream service.
+
+    Each call runs on a small thread pool and is waited on for at most its
+    timeout, so a hung upstream costs the caller the timeout and nothing
+    more. A call given less than the full timeout (e.g. by a request's
+    remaining budget) that runs out of time says nothing about the
+    upstream, so only timeouts at the full per-call timeout count as
+    failures. After `failure_threshold` consecutive failures the circuit
+    opens and calls are rejected immediately. While open, a background
+    thread runs `probe` every `reset_timeout` seconds on its own executor,
+    so calls still hung in the pool can't starve it. The circuit closes
+    again after the first successful probe, and no request ever waits on a
+    probe.
+    """
+
+    def __init__(self, name, probe=None, failure_threshold=5, reset_timeout=30.0, timeout=5.0, max_workers=8):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-call")
+        self._probe_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-probe")
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._counts = {"calls": 0, "successes": 0, "failures": 0, "timeouts": 0, "cut_short": 0, "rejected": 0, "opened": 0}
+        self._histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    @property
+    def state(self):
+        return self._state
+
+    def _record_latency(self, seconds):
+        milliseconds = seconds * 1000
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if milliseconds <= bound), len(LATENCY_BUCKETS_MS))
+        self._histogram[bucket] += 1
+
+    def _on_success(self, seconds):
+        with self._lock:
+            self._counts["successes"] += 1
+            self._record_latency(seconds)
+            self._consecutive_failures = 0
+
+    def _on_failure(self, seconds, timed_out):
+        with self._lock:
+            self._counts["timeouts" if timed_out else "failures"] += 1
+            self._record_latency(seconds)
+            self._consecutive_failures += 1
+            if self._state != CLOSED or self._consecutive_failures < self.failure_threshold:
+                return
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self._counts["opened"] += 1
+        logger.warning(f"{self.name}: circuit opened after {self.failure_threshold} consecutive failures")
+        threading.Thread(target=self._probe_until_closed, name=f"{self.name}-probe", daemon=True).start()
+
+    def _probe_until_closed(self):
+        while True:
+            time.sleep(self.reset_timeout)
+            with self._lock:
+                self._state = HALF_OPEN
+            try:
+                if self.probe is not None:
+                    self._probe_pool.submit(self.probe).result(timeout=self.timeout)
+            except Exception as e:
+                logger.info(f"{self.name}: recovery probe failed: {e}")
+                with self._lock:
+                    self._state = OPEN
+                    self._opened_at = time.monotonic()
+                continue
+            with self._lock:
+                self._state = CLOSED
+                self._consecutive_failures = 0
+            logger.info(f"{self.name}: circuit closed, upstream recovered")
+            return
+
+    def call(self, function, *args, timeout=None, **kwargs):
+        """Run `function(*args, **kwargs)` within `timeout` seconds (default self.timeout)"""
+        with self._lock:
+            self._counts["calls"] += 1
+            if self._state != CLOSED:
+                self._counts["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} is unavailable")
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        started = time.monotonic()
+        future = self._pool.submit(function, *args, **kwargs)
+        try:
+            result = future.result(timeout=max(0.0, timeout))
+        except FutureTimeoutError:
+            future.cancel()
+            if timeout >= self.timeout:
+                self._on_failure(time.monotonic() - started, timed_out=True)
+            else:
+                with self._lock:
+                    self._counts["cut_short"] += 1
+            raise CallTimeoutError(f"{self.name} did not answer within {timeout:.2f}s")
+        except Exception:
+            self._on_failure(time.monotonic() - started, timed_out=False)
+            raise
+        self._on_success(time.monotonic() - started)
+        return result
+
+    def stats(self):
+        with self._lock:
+            buckets = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "open_for_s": round(time.monotonic() - self._opened_at, 1) if self._state != CLOSED else 0.0,
+                **self._counts,
+                "latency_histogram": dict(zip(buckets, self._histogram))
+            }
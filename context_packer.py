@@ -0,0 +1,159 @@
+"""
+Context Packer
+Fits the retrieved chunks into a token budget for the RetrievalQA prompt
+"""
+
+import os
+import re
+import time
+import logging
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Any
+
+from numpy_store import Document, BaseRetriever
+from bm25_index import tokenize
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("AGRI_CONTEXT_TOKENS", "350"))
+# Chunks retrieved before packing; the budget decides how many are sent
+CONTEXT_CANDIDATES = int(os.getenv("AGRI_CONTEXT_CANDIDATES", "8"))
+# A sentence is dropped when this share of its terms is already in the context
+OVERLAP_THRESHOLD = 0.8
+# Recent packs kept for the prompt size statistics
+_SAMPLES = 1000
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?।])\s+|\n+")
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # Loading the BPE ranks is slow (and may download them), so it waits for the first prompt
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding not available, estimating token counts: {e}")
+        return None
+
+def count_tokens(text):
+    """Tokens in `text`; an estimate of about four characters per token without tiktoken"""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text) if sentence.strip()]
+
+class ContextPacker:
+    """
+    Greedy packer for retrieved chunks.
+
+    Chunks are ranked by their retrieval rank plus the share of question
+    terms they contain. Going down that ranking, sentences that mostly
+    repeat context already taken (neighbouring chunks overlap, and the
+    same scheme text appears in several sources) are dropped, whole chunks
+    are taken while they fit, and a chunk that doesn't fit contributes only
+    its sentences that match the question best, until the budget is full.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, overlap_threshold=OVERLAP_THRESHOLD):
+        self.budget = budget
+        self.overlap_threshold = overlap_threshold
+        self._lock = threading.Lock()
+        self._packs = deque(maxlen=_SAMPLES)  # (candidate tokens, packed tokens, seconds)
+
+    def _rank(self, query_terms, docs):
+        def score(item):
+            rank, doc = item
+            terms = set(tokenize(doc.page_content))
+            coverage = len(query_terms & terms) / len(query_terms) if query_terms else 0.0
+            return 1.0 / (rank + 1) + coverage
+        return [doc for _, doc in sorted(enumerate(docs), key=score, reverse=True)]
+
+    def _is_redundant(self, terms, seen):
+        if not terms:
+            return True
+        return any(len(terms & other) >= self.overlap_threshold * len(terms) for other in seen)
+
+    def pack(self, query, docs):
+        """Return the documents to put in the prompt, trimmed to the token budget"""
+        started = time.perf_counter()
+        query_terms = set(tokenize(query))
+        seen = []
+        packed = []
+        used = 0
+        for doc in self._rank(query_terms, docs):
+            sentences = []
+            for sentence in split_sentences(doc.page_content):
+                terms = set(tokenize(sentence))
+                if not self._is_redundant(terms, seen + [terms for _, terms, _ in sentences]):
+                    sentences.append((sentence, terms, count_tokens(sentence)))
+            if not sentences:
+                continue
+
+            remaining = self.budget - used
+            if sum(tokens for _, _, tokens in sentences) > remaining:
+                # Only the best matching sentences of this chunk fit, kept in their original order
+                order = sorted(range(len(sentences)), key=lambda i: len(sentences[i][1] & query_terms), reverse=True)
+                keep = set()
+                for i in order:
+                    if sentences[i][2] <= remaining:
+                        keep.add(i)
+                        remaining -= sentences[i][2]
+                sentences = [sentences[i] for i in sorted(keep)]
+            if not sentences:
+                continue
+
+            seen.extend(terms for _, terms, _ in sentences)
+            text = " ".join(sentence for sentence, _, _ in sentences)
+            used += sum(tokens for _, _, tokens in sentences)
+            packed.append(Document(page_content=text, metadata=dict(doc.metadata)))
+            if used >= self.budget:
+                break
+
+        candidate_tokens = sum(count_tokens(doc.page_content) for doc in docs)
+        with self._lock:
+            self._packs.append((candidate_tokens, used, time.perf_counter() - started))
+        return packed
+
+    def stats(self):
+        with self._lock:
+            packs = list(self._packs)
+        if not packs:
+            return {"packs": 0, "budget": self.budget, "exact_tokens": _encoding() is not None}
+
+        def summary(values):
+            values = sorted(values)
+            return {"mean": round(sum(values) / len(values), 1), "p95": values[min(len(values) - 1, int(0.95 * len(values)))]}
+
+        return {
+            "packs": len(packs),
+            "candidate_tokens": summary([candidate for candidate, _, _ in packs]),
+            "packed_tokens": summary([packed for _, packed, _ in packs]),
+            "pack_ms": summary([round(seconds * 1000, 2) for _, _, seconds in packs]),
+            "budget": self.budget,
+            "exact_tokens": _encoding() is not None
+        }
+
+class PackedRetriever(BaseRetriever):
+    """Retriever that packs the results of another retriever into the token budget"""
+
+    retriever: Any
+    packer: Any
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.packer.pack(query, self.retriever.invoke(query))
+
+# Initialize the context packer
+context_packer = ContextPacker()
@@ -0,0 +1,112 @@
+"""
+Near-Duplicate Chunk Filter
+MinHash signatures with LSH banding drop repeated boilerplate before embedding
+"""
+
+import os
+import re
+import zlib
+import logging
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Estimated Jaccard similarity (of word shingles) at which a chunk counts as a copy
+DEDUP_THRESHOLD = float(os.getenv("AGRI_DEDUP_THRESHOLD", "0.85"))
+NUM_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r"\w+")
+
+def _choose_bands(num_perm, threshold):
+    """Pick the LSH band layout whose candidate threshold sits just below `threshold`"""
+    best = (1, num_perm)
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+            break
+    return best
+
+class NearDuplicateFilter:
+    """
+    Streaming near-duplicate detector.
+
+    Every chunk costs one signature and one bucket lookup per band, so
+    filtering is linear in the number of chunks; candidates sharing a band
+    are confirmed against the full signature before a chunk is dropped.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERMUTATIONS, shingle_size=SHINGLE_SIZE, seed=1):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _choose_bands(num_perm, threshold)
+        self.enabled = NUMPY_AVAILABLE and threshold < 1.0
+        self.seen = 0
+        self.removed = 0
+        self._exact = set()
+        self._buckets = {}
+        self._signatures = []
+        if self.enabled:
+            rng = np.random.RandomState(seed)
+            self._a = rng.randint(1, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+            self._b = rng.randint(0, _MERSENNE_PRIME, size=(num_perm, 1), dtype=np.int64)
+        elif threshold < 1.0:
+            logger.warning("numpy not available, only exact duplicate chunks will be removed")
+
+    def _signature(self, words):
+        size = min(self.shingle_size, len(words))
+        shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.int64, count=len(shingles))
+        return ((self._a * hashes + self._b) % _MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+    def is_duplicate(self, text):
+        """Return True if `text` repeats a chunk seen before, otherwise remember it"""
+        self.seen += 1
+        words = _WORD_RE.findall(text.lower())
+        key = " ".join(words)
+        if key in self._exact:
+            self.removed += 1
+            return True
+        self._exact.add(key)
+        if not self.enabled or not words:
+            return False
+
+        signature = self._signature(words)
+        band_keys = [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                     for band in range(self.bands)]
+        candidates = set()
+        for band_key in band_keys:
+            candidates.update(self._buckets.get(band_key, ()))
+        for candidate in candidates:
+            if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                self.removed += 1
+                return True
+
+        index = len(self._signatures)
+        self._signatures.append(signature)
+        for band_key in band_keys:
+            self._buckets.setdefault(band_key, []).append(index)
+        return False
+
+    def filter(self, chunks):
+        """Yield only the chunks that are not near-duplicates of earlier ones"""
+        for chunk in chunks:
+            if not self.is_duplicate(chunk):
+                yield chunk
+
+    def stats(self):
+        return {
+            "seen": self.seen,
+            "removed": self.removed,
+            "removed_ratio": round(self.removed / self.seen, 4) if self.seen else 0.0,
+            "threshold": self.threshold
+        }
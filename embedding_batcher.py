@@ -0,0 +1,104 @@
+"""
+Query Embedding Batcher
+Collects query embeddings from concurrent requests and encodes them as one batch
+"""
+
+import os
+import time
+import queue
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+QUERY_BATCH_SIZE = int(os.getenv("AGRI_QUERY_BATCH_SIZE", "16"))
+QUERY_BATCH_WAIT_MS = float(os.getenv("AGRI_QUERY_BATCH_WAIT_MS", "5"))
+# Recent waits kept for latency percentiles
+_LATENCY_SAMPLES = 1000
+
+class QueryEmbeddingBatcher:
+    """
+    Shared executor for query embeddings.
+
+    Request threads call `embed(text)` and block on a future. A single
+    worker thread takes the first waiting query, gathers more for at most
+    `max_wait_ms` (or until `max_batch_size` are waiting) and encodes them
+    with one `embed_many` call, so concurrent requests share one forward
+    pass instead of competing for cores.
+    """
+
+    def __init__(self, embed_many, max_batch_size=QUERY_BATCH_SIZE, max_wait_ms=QUERY_BATCH_WAIT_MS):
+        self.embed_many = embed_many
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._batches = 0
+        self._queries = 0
+        self._waits = deque(maxlen=_LATENCY_SAMPLES)
+
+    def _ensure_worker(self):
+        # Also restarts the worker in a process forked after it was started
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name="query-embedder", daemon=True)
+                    self._worker.start()
+
+    def embed(self, text, timeout=None):
+        """Embed one query, sharing the model call with concurrent callers"""
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        self._ensure_worker()
+        return future.result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            with self._lock:
+                self._batches += 1
+                self._queries += len(batch)
+                self._waits.extend(started - queued for _, _, queued in batch)
+            try:
+                vectors = self.embed_many([text for text, _, _ in batch])
+                for (_, future, _), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                logger.error(f"Error embedding query batch: {str(e)}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            batches, queries = self._batches, self._queries
+        mean_batch = queries / batches if batches else 0.0
+
+        def percentile(p):
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 2) if waits else 0.0
+
+        return {
+            "batches": batches,
+            "queries": queries,
+            "mean_batch_size": round(mean_batch, 2),
+            "occupancy": round(mean_batch / self.max_batch_size, 3),
+            "added_latency_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)},
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
@@ -0,0 +1,205 @@
+"""
+Embedding Cache
+Content-addressed chunk embeddings in a memory-mapped float32 file shared by all processes
+"""
+
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+from embedding_batcher import QueryEmbeddingBatcher
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_DIRECTORY = os.getenv("AGRI_EMBEDDING_CACHE_DIR", "embedding_cache")
+# SQLite limits the number of host parameters per statement
+_LOOKUP_BATCH = 500
+
+class EmbeddingCache:
+    """
+    Append-only store of embeddings for one model.
+
+    Vectors live back to back in `vectors.f32` and are read through
+    np.memmap, so every worker shares the same page-cache pages instead of
+    holding its own copy. A small SQLite table maps each chunk hash to its
+    row; SQLite's write lock also serialises appends between processes.
+    """
+
+    def __init__(self, model_key, cache_dir=EMBEDDING_CACHE_DIRECTORY):
+        self.model_key = model_key
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_key))
+        os.makedirs(self.directory, exist_ok=True)
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._index_path = os.path.join(self.directory, "index.sqlite")
+        self._local = threading.local()
+        self._map_lock = threading.Lock()
+        self._map = None
+        self.dim = None
+        self.hits = 0
+        self.misses = 0
+
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS vectors (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._load_dim()
+
+    def _connect(self):
+        # One connection per thread; sqlite3 connections can't be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._index_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _load_dim(self):
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model_key}\0{text}".encode("utf-8")).hexdigest()
+
+    def _rows_for(self, keys):
+        rows = {}
+        conn = self._connect()
+        for start in range(0, len(keys), _LOOKUP_BATCH):
+            batch = keys[start:start + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows.update(conn.execute(f"SELECT hash, row FROM vectors WHERE hash IN ({placeholders})", batch))
+        return rows
+
+    def _matrix(self, needed_rows):
+        """Memory-mapped view of the vector file, remapped when other writers grew it"""
+        with self._map_lock:
+            if self._map is None or self._map.shape[0] < needed_rows:
+                if self.dim is None:
+                    self._load_dim()
+                rows = os.path.getsize(self._vectors_path) // (self.dim * 4)
+                self._map = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+            return self._map
+
+    def get_many(self, texts):
+        """Return a list aligned with `texts` holding a read-only vector or None for each"""
+        keys = [self.key(text) for text in texts]
+        rows = self._rows_for(keys) if keys else {}
+        found = [rows.get(key) for key in keys]
+        hits = [row for row in found if row is not None]
+        self.hits += len(hits)
+        self.misses += len(found) - len(hits)
+        if not hits:
+            return [None] * len(texts)
+        matrix = self._matrix(max(hits) + 1)
+        return [matrix[row] if row is not None else None for row in found]
+
+    def put_many(self, texts, vectors):
+        """Append vectors for texts that are not cached yet"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(texts):
+            return
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self.dim is None:
+                self._load_dim()
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match cache size {self.dim}")
+
+            keys = [self.key(text) for text in texts]
+            existing = self._rows_for(keys)
+            new = {}
+            for key, vector in zip(keys, vectors):
+                if key not in existing and key not in new:
+                    new[key] = vector
+            if new:
+                row_bytes = self.dim * 4
+                with open(self._vectors_path, "ab") as file:
+                    size = file.seek(0, os.SEEK_END)
+                    if size % row_bytes:
+                        # Drop a torn row left behind by a crashed writer
+                        file.truncate(size - size % row_bytes)
+                        size -= size % row_bytes
+                    first_row = size // row_bytes
+                    file.write(np.stack(list(new.values())).tobytes())
+                conn.executemany("INSERT INTO vectors (hash, row) VALUES (?, ?)",
+                                 [(key, first_row + i) for i, key in enumerate(new)])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+class CachedEmbeddings:
+    """
+    Embeddings wrapper that only calls the model for chunks it has never seen.
+
+    `factory` builds the real embedding model on first use, so a rebuild
+    served entirely from the cache never loads the model for documents.
+    Queries are not cached; with `batch_queries` they go through a shared
+    QueryEmbeddingBatcher so concurrent requests are encoded together.
+    """
+
+    def __init__(self, factory, model_key, cache_dir=EMBEDDING_CACHE_DIRECTORY, batch_queries=True):
+        self._factory = factory
+        self._embeddings = None
+        self._lock = threading.Lock()
+        self.cache = EmbeddingCache(model_key, cache_dir)
+        self.query_batcher = QueryEmbeddingBatcher(self._embed_many) if batch_queries else None
+
+    @property
+    def embeddings(self):
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = self._factory()
+            return self._embeddings
+
+    def embed_documents(self, texts):
+        vectors = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(texts[i] for i, vector in enumerate(vectors) if vector is None))
+        if missing:
+            computed = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            self.cache.put_many(missing, list(computed.values()))
+            vectors = [computed[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        # Cached rows stay read-only views into the memory map; NumpyVectorStore takes them as they are
+        return [np.asarray(vector, dtype=np.float32) for vector in vectors]
+
+    def _embed_many(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        if self.query_batcher is not None:
+            return self.query_batcher.embed(text)
+        return self.embeddings.embed_query(text)
+
+    def stats(self):
+        return {
+            "cache": self.cache.stats(),
+            "query_batching": self.query_batcher.stats() if self.query_batcher else None
+        }
+
+class ListEmbeddings:
+    """Chroma-facing wrapper: Chroma only accepts embeddings as lists of floats"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts):
+        return [vector.tolist() for vector in self.embeddings.embed_documents(texts)]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
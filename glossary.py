@@ -0,0 +1,76 @@
+"""
+Glossary
+Agricultural term corrections compiled per language into one trie-shaped regex
+"""
+
+import os
+import re
+import json
+import logging
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+GLOSSARY_DIRECTORY = os.getenv("AGRI_GLOSSARY_DIR", "Data/glossary")
+
+def _trie_pattern(node):
+    """Regex for the terms below a trie node; optional tails are greedy, so the longest term wins"""
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    if len(branches) == 1 and "" not in node:
+        return branches[0]
+    pattern = "(?:" + "|".join(branches) + ")"
+    return pattern + "?" if "" in node else pattern
+
+class Glossary:
+    """
+    English term -> preferred local term for one language.
+
+    The terms are folded into a trie and the trie is written out as a
+    single regex, so a rewrite is one left-to-right scan whatever the size
+    of the glossary. A term only matches as a whole word ("plant" leaves
+    "plantation" alone), the longest term starting at a position wins, and
+    replaced text is never scanned again.
+    """
+
+    def __init__(self, terms):
+        self.terms = {term.lower(): local for term, local in terms.items() if term.strip()}
+        trie = {}
+        for term in self.terms:
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self._pattern = re.compile(rf"(?<!\w){_trie_pattern(trie)}(?!\w)", re.IGNORECASE) if self.terms else None
+
+    def _replace(self, match):
+        text = match.group()
+        local = self.terms[text.lower()]
+        # Keep a capital at the start of a sentence or heading
+        if text[:1].isupper() and local[:1].islower():
+            local = local[:1].upper() + local[1:]
+        return local
+
+    def apply(self, text):
+        if self._pattern is None:
+            return text
+        return self._pattern.sub(self._replace, text)
+
+    def __len__(self):
+        return len(self.terms)
+
+def load_glossaries(languages, directory=GLOSSARY_DIRECTORY):
+    """{language: Glossary} from `<directory>/<language>.json` files holding {english term: local term}"""
+    glossaries = {}
+    for language in languages:
+        path = os.path.join(directory, f"{language}.json")
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                glossaries[language] = Glossary(json.load(file))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping glossary {path}: {e}")
+    logger.info(f"Loaded glossaries for {len(glossaries)} languages ({sum(map(len, glossaries.values()))} terms)")
+    return glossaries
@@ -0,0 +1,132 @@
+"""
+Batched Ingestion Pipeline
+Streams chunks into the vector store in fixed-size batches with a memory ceiling
+"""
+
+import os
+import gc
+import sys
+import time
+import queue
+import logging
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = int(os.getenv("AGRI_INGEST_BATCH_SIZE", "64"))
+INGEST_MAX_RSS_MB = int(os.getenv("AGRI_INGEST_MAX_RSS_MB", "1536"))
+# Batches the producer may run ahead of the embedder before it has to wait
+INGEST_QUEUE_BATCHES = 2
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or None if it can't be measured"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if it can't be measured"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+_DONE = object()
+
+def ingest_chunks(add_batch, chunks, batch_size=None, max_rss_mb=None):
+    """
+    Feed `chunks` to `add_batch(start_index, texts)` in fixed-size batches.
+
+    Chunks are produced on a background thread into a bounded queue, so
+    extraction and chunking overlap with embedding but can never run more
+    than INGEST_QUEUE_BATCHES ahead of it. When RSS goes over `max_rss_mb`
+    the producer waits for the embedder to drain the queue and then halves
+    the batch size. Returns a dict of throughput and memory statistics.
+    """
+    batch_size = batch_size or INGEST_BATCH_SIZE
+    max_rss_mb = max_rss_mb or INGEST_MAX_RSS_MB
+    batches = queue.Queue(maxsize=INGEST_QUEUE_BATCHES)
+    stop = threading.Event()
+    stats = {"chunks": 0, "batches": 0, "throttled": 0, "batch_size": batch_size}
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        size = batch_size
+        batch = []
+        try:
+            for chunk in chunks:
+                if stop.is_set():
+                    return
+                batch.append(chunk)
+                if len(batch) < size:
+                    continue
+                rss = current_rss_mb()
+                if rss is not None and rss > max_rss_mb:
+                    # Backpressure: let the embedder catch up before producing more
+                    stats["throttled"] += 1
+                    batches.join()
+                    gc.collect()
+                    if size > 1:
+                        size = max(1, size // 2)
+                        logger.warning(f"RSS {rss:.0f}MB over {max_rss_mb}MB ceiling, batch size now {size}")
+                if not put(batch):
+                    return
+                batch = []
+            if batch and not put(batch):
+                return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, name="ingest-producer", daemon=True)
+    started = time.perf_counter()
+    producer.start()
+    try:
+        while True:
+            item = batches.get()
+            try:
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                add_batch(stats["chunks"], item)
+                stats["chunks"] += len(item)
+                stats["batches"] += 1
+            finally:
+                batches.task_done()
+    finally:
+        stop.set()
+        # Release a producer that is waiting for the queue to drain
+        while True:
+            try:
+                batches.get_nowait()
+                batches.task_done()
+            except queue.Empty:
+                break
+        producer.join()
+
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["chunks_per_sec"] = round(stats["chunks"] / elapsed, 1) if elapsed else 0.0
+    stats["peak_rss_mb"] = round(peak_rss_mb(), 1) if resource is not None else None
+    logger.info(f"Ingested {stats['chunks']} chunks in {stats['batches']} batches "
+                f"({stats['chunks_per_sec']} chunks/sec, peak RSS {stats['peak_rss_mb']}MB)")
+    return stats
@@ -0,0 +1,213 @@
+"""
+Intent Classifier
+Hashed n-gram linear model that decides whether a question needs retrieval and the LLM
+
+Train (and report cross-validated accuracy) with:
+    python intent_classifier.py Data/intents/queries.csv -o intent_model.npz
+"""
+
+import os
+import re
+import csv
+import time
+import zlib
+import logging
+import argparse
+import threading
+import unicodedata
+from collections import deque
+
+import numpy as np
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+INTENT_MODEL_PATH = os.getenv("AGRI_INTENT_MODEL", "intent_model.npz")
+INTENT_SOURCES = ("Data/intents/queries.csv",)
+# Below this probability the question goes to retrieval and the LLM
+INTENT_THRESHOLD = float(os.getenv("AGRI_INTENT_THRESHOLD", "0.6"))
+# market: live prices, kb: the knowledge base, meta: about the assistant, rag: retrieval and the LLM
+LABELS = ("market", "kb", "meta", "rag")
+FALLBACK_LABEL = "rag"
+HASH_DIMENSIONS = 1 << 14
+# Recent classifications kept for the latency statistics
+_SAMPLES = 1000
+
+_WORD_RE = re.compile(r"\w+")
+
+def features(text):
+    """Hashed feature indices and weights: words, word bigrams and character trigrams, L2-normalized"""
+    words = _WORD_RE.findall(unicodedata.normalize("NFC", text).casefold())
+    grams = [f"w:{word}" for word in words]
+    grams += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    if not grams:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    # crc32 rather than hash() so indices are the same in every process
+    indices, counts = np.unique(
+        np.fromiter((zlib.crc32(gram.encode("utf-8")) % HASH_DIMENSIONS for gram in grams), dtype=np.int64, count=len(grams)),
+        return_counts=True
+    )
+    values = counts.astype(np.float32)
+    return indices, values / np.linalg.norm(values)
+
+def _softmax(scores):
+    scores = scores - scores.max(axis=-1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+def _matrix(queries):
+    X = np.zeros((len(queries), HASH_DIMENSIONS), dtype=np.float32)
+    for row, query in enumerate(queries):
+        indices, values = features(query)
+        X[row, indices] = values
+    return X
+
+def fit(queries, labels, epochs=300, learning_rate=2.0, l2=1e-4):
+    """Multinomial logistic regression by full-batch gradient descent; returns (weights, bias)"""
+    X = _matrix(queries)
+    Y = np.zeros((len(labels), len(LABELS)), dtype=np.float32)
+    Y[np.arange(len(labels)), [LABELS.index(label) for label in labels]] = 1.0
+    weights = np.zeros((HASH_DIMENSIONS, len(LABELS)), dtype=np.float32)
+    bias = np.zeros(len(LABELS), dtype=np.float32)
+    for _ in range(epochs):
+        error = (_softmax(X @ weights + bias) - Y) / len(labels)
+        weights -= learning_rate * (X.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+    return weights, bias
+
+def load_examples(sources=INTENT_SOURCES):
+    """(queries, labels) from CSV files with label,query columns"""
+    queries, labels = [], []
+    for source in sources:
+        with open(source, "r", encoding="utf-8", newline="") as file:
+            for row in csv.DictReader(file):
+                label = row["label"].strip()
+                if label not in LABELS:
+                    raise ValueError(f"{source}: unknown intent label {label!r}")
+                queries.append(row["query"])
+                labels.append(label)
+    return queries, labels
+
+def cross_validate(queries, labels, folds=5, seed=0):
+    """Share of examples routed correctly by models trained without them"""
+    order = np.random.default_rng(seed).permutation(len(queries))
+    correct = 0
+    for fold in range(folds):
+        held_out = set(order[fold::folds].tolist())
+        train = [i for i in range(len(queries)) if i not in held_out]
+        weights, bias = fit([queries[i] for i in train], [labels[i] for i in train])
+        for i in held_out:
+            indices, values = features(queries[i])
+            correct += LABELS[int(np.argmax(values @ weights[indices] + bias))] == labels[i]
+    return correct / len(queries)
+
+def train_intent_model(sources=INTENT_SOURCES, path=INTENT_MODEL_PATH):
+    """Train on the labelled queries and save the model with its cross-validated accuracy"""
+    queries, labels = load_examples(sources)
+    accuracy = cross_validate(queries, labels)
+    weights, bias = fit(queries, labels)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp_path, weights=weights, bias=bias, labels=np.array(LABELS), accuracy=accuracy)
+    os.replace(tmp_path, path)
+    logger.info(f"Trained intent model {path} on {len(queries)} queries, cross-validated accuracy {accuracy:.1%}")
+    return accuracy
+
+class IntentClassifier:
+    """
+    Routes a question to market, kb, meta or rag.
+
+    A question is a handful of hashed features, so classifying it is one
+    sparse row of the weight matrix summed per label and a softmax, tens of
+    microseconds. Anything the model is not confident about goes to rag.
+    The model is retrained from INTENT_SOURCES when it is missing or older
+    than them; `load()` does that off the request path (the app calls it
+    from the index builder), and until it has run every question goes to rag.
+    """
+
+    def __init__(self, path=INTENT_MODEL_PATH, sources=INTENT_SOURCES, threshold=INTENT_THRESHOLD):
+        self.path = path
+        self.sources = sources
+        self.threshold = threshold
+        self._model = None
+        self._lock = threading.Lock()
+        self._routes = dict.fromkeys(LABELS, 0)
+        self._uncertain = 0
+        self._bypassed = 0
+        self._latencies = deque(maxlen=_SAMPLES)
+
+    def _is_stale(self):
+        if not os.path.exists(self.path):
+            return True
+        built = os.path.getmtime(self.path)
+        return any(os.path.exists(source) and os.path.getmtime(source) > built for source in self.sources)
+
+    def load(self):
+        """Load the model, training it first if it is missing or stale"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    if self._is_stale():
+                        train_intent_model(self.sources, self.path)
+                    with np.load(self.path) as data:
+                        self._model = (data["weights"], data["bias"], tuple(data["labels"].tolist()), float(data["accuracy"]))
+        return self._model
+
+    def classify(self, query):
+        """Return (label, probability); label is rag when the model is not confident or not loaded yet"""
+        model = self._model
+        if model is None:
+            with self._lock:
+                self._uncertain += 1
+                self._routes[FALLBACK_LABEL] += 1
+            return FALLBACK_LABEL, 0.0
+        weights, bias, labels, _ = model
+        started = time.perf_counter()
+        indices, values = features(query)
+        probabilities = _softmax(values @ weights[indices] + bias)
+        best = int(np.argmax(probabilities))
+        label, probability = labels[best], float(probabilities[best])
+        with self._lock:
+            if probability < self.threshold:
+                label = FALLBACK_LABEL
+                self._uncertain += 1
+            self._routes[label] += 1
+            self._latencies.append(time.perf_counter() - started)
+        return label, probability
+
+    def record_bypass(self):
+        """Count a question answered without the LLM because of its route"""
+        with self._lock:
+            self._bypassed += 1
+
+    def stats(self):
+        model = self._model
+        with self._lock:
+            latencies = sorted(self._latencies)
+            data = {
+                "loaded": model is not None,
+                "accuracy": round(model[3], 3) if model is not None else None,
+                "threshold": self.threshold,
+                "routes": dict(self._routes),
+                "uncertain": self._uncertain,
+                "llm_calls_avoided": self._bypassed
+            }
+        if latencies:
+            data["classify_ms"] = {
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+                "p95": round(latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000, 3)
+            }
+        return data
+
+# Initialize the intent classifier
+intent_classifier = IntentClassifier()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Train the AgriGenius intent classifier from labelled queries")
+    parser.add_argument("sources", nargs="*", default=list(INTENT_SOURCES), help="CSV files with label,query columns")
+    parser.add_argument("-o", "--output", default=INTENT_MODEL_PATH, help="model file to write")
+    args = parser.parse_args()
+    train_intent_model(args.sources, args.output)
@@ -0,0 +1,192 @@
+"""
+Intent Router
+One routing table compiled into an Aho-Corasick automaton; a single scan gives intent, crop and topic
+"""
+
+import re
+import logging
+import unicodedata
+from collections import deque, namedtuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# (kind, value) -> keywords. Matches respect word boundaries; a trailing "*"
+# matches any word starting with the keyword (e.g. "irrigat*" for irrigation).
+ROUTING_TABLE = {
+    ("intent", "developer"): [
+        "who developed you", "who created you", "who made you", "who built you",
+        "आपको किसने बनाया", "आपका डेवलपर कौन है", "तुम्हें किसने बनाया",
+        "quién te desarrolló", "quién te creó", "quién te hizo",
+        "qui t'a développé", "qui t'a créé", "qui t'a fait",
+        "wer hat dich entwickelt", "wer hat dich geschaffen", "wer hat dich gemacht",
+        "من طورك", "من خلقك", "من صنعك",
+        "কে তোমাকে তৈরি করেছে", "তোমার ডেভেলপার কে",
+        "உன்னை யார் உருவாக்கினார்கள்", "உன்னை யார் உருவாக்கியது",
+        "మిమ్మల్ని ఎవరు అభివృద్ధి చేశారు", "మిమ్మల్ని ఎవరు సృష్టించారు"
+    ],
+    ("intent", "market"): [
+        "price*", "cost", "costs", "rate", "rates", "market", "markets", "sell*", "buy*", "mandi",
+        "wholesale", "retail", "msp", "मूल्य", "कीमत", "दर", "बाज़ार", "बाजार", "भाव", "मंडी"
+    ],
+    ("crop", "wheat"): ["wheat", "गेहूं", "गेहूँ", "trigo", "blé", "weizen"],
+    ("crop", "rice"): ["rice", "paddy", "चावल", "धान", "arroz", "riz", "reis"],
+    ("crop", "corn"): ["corn", "maize", "मक्का", "maíz", "maïs"],
+    ("crop", "tomato"): ["tomato", "tomatoes", "टमाटर", "tomate", "tomates", "tomaten"],
+    ("topic", "soil"): ["soil*", "ph", "fertility", "ground", "मिट्टी", "भूमि", "suelo", "boden"],
+    ("topic", "fertilizer"): [
+        "fertiliz*", "fertilis*", "nutrient*", "feed", "manure", "compost*", "urea", "nitrogen", "phosph*", "potash", "potassium",
+        "खाद", "उर्वरक", "fertilizante", "engrais", "dünger"
+    ],
+    ("topic", "pest"): [
+        "pest*", "insect*", "bug", "bugs", "disease*", "control", "weed*",
+        "कीट", "रोग", "plaga", "plagas", "ravageur*", "schädling*"
+    ],
+    ("topic", "weather"): ["weather", "climate", "temperature", "rain", "rains", "rainfall", "monsoon", "water", "मानसून", "बारिश"],
+    ("topic", "irrigation"): ["water", "watering", "irrigat*", "drip", "पानी", "सिंचाई", "riego"],
+    ("topic", "timing"): ["when", "time", "season*", "plant*", "harvest*", "sow*", "मौसम", "कब", "समय", "बुवाई"],
+    ("topic", "farming"): [
+        "farm*", "agricultur*", "grow*", "cultivat*", "plant*", "खेती", "फसल", "किसान",
+        "agricultura", "cultivo", "landwirtschaft"
+    ],
+    ("modifier", "ph"): ["ph", "acidic", "alkaline"],
+    ("modifier", "fertility"): ["fertile", "fertility", "nutrient*"],
+    ("modifier", "organic"): ["organic*", "natural", "जैविक"],
+    ("modifier", "synthetic"): ["synthetic", "chemical*", "npk", "रासायनिक"],
+    ("modifier", "prevent"): ["prevent*"]
+}
+# When a query matches several, the first one listed wins
+INTENT_PRIORITY = ("developer", "market")
+TOPIC_PRIORITY = ("soil", "fertilizer", "pest", "weather", "irrigation", "timing", "farming")
+
+# Words that carry no subject of their own; any other word a keyword doesn't cover is left in Route.uncovered
+STOPWORDS = frozenset("""
+a about am an and any are at be can could do does for from give how i in is it me my need of on or
+please should tell the this to today what when where which why with you your
+tips advice guide basics info information
+""".split())
+
+Route = namedtuple("Route", "intent crop topic topics modifiers uncovered")
+
+_WORD_RE = re.compile(r"\w+")
+
+def _is_word_char(char):
+    # Letters, digits and combining marks (Indic vowel signs) all continue a word
+    return char.isalnum() or char == "_" or unicodedata.category(char)[0] == "M"
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over casefolded keywords.
+
+    `scan` walks the text once, following failure links on mismatches, and
+    reports every keyword occurrence that sits on word boundaries, so "ph"
+    doesn't fire inside "phosphorus" nor "rate" inside "irrigate".
+    """
+
+    def __init__(self, keywords):
+        # keywords: {keyword: payload}
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for keyword, payload in keywords.items():
+            prefix = keyword.endswith("*")
+            word = unicodedata.normalize("NFC", keyword.rstrip("*")).casefold()
+            node = 0
+            for char in word:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            self._out[node].append((len(word), prefix, payload))
+
+        # Breadth-first so a node's failure target is finished before it
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def scan(self, text):
+        """Yield (start, end, payload) for each whole-word keyword match in casefolded `text`"""
+        node = 0
+        last = len(text) - 1
+        for i, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, prefix, payload in self._out[node]:
+                start = i - length + 1
+                if start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if not prefix and i < last and _is_word_char(text[i + 1]):
+                    continue
+                end = i + 1
+                if prefix:
+                    while end <= last and _is_word_char(text[end]):
+                        end += 1
+                yield start, end, payload
+
+class IntentRouter:
+    """Routes a query to (intent, crop, topic) with the automaton compiled from `table`"""
+
+    def __init__(self, table=ROUTING_TABLE):
+        labels = {}
+        for label, keywords in table.items():
+            for keyword in keywords:
+                found = labels.setdefault(keyword, [])
+                if label not in found:
+                    found.append(label)
+        self._automaton = KeywordAutomaton({keyword: tuple(found) for keyword, found in labels.items()})
+        logger.info(f"Intent router compiled {len(labels)} keywords")
+
+    def route(self, query):
+        """
+        Return a Route; crop is the first crop mentioned, topic the highest
+        priority topic, uncovered the words outside every keyword match
+        """
+        text = unicodedata.normalize("NFC", query).casefold()
+        intents, topics, modifiers = set(), set(), set()
+        crop = None
+        covered = []
+        for start, end, labels in self._automaton.scan(text):
+            covered.append((start, end))
+            for kind, value in labels:
+                if kind == "intent":
+                    intents.add(value)
+                elif kind == "crop":
+                    crop = crop or value
+                elif kind == "topic":
+                    topics.add(value)
+                else:
+                    modifiers.add(value)
+        intent = next((name for name in INTENT_PRIORITY if name in intents), None)
+        topic = next((name for name in TOPIC_PRIORITY if name in topics), None)
+        uncovered = tuple(
+            word.group() for word in _WORD_RE.finditer(text)
+            if word.group() not in STOPWORDS
+            and not any(start < word.end() and word.start() < end for start, end in covered)
+        )
+        return Route(intent, crop, topic, frozenset(topics), frozenset(modifiers), uncovered)
+
+def with_knowledge_crops(table):
+    """`table` plus every crop (and its aliases) in the knowledge store"""
+    table = {label: list(keywords) for label, keywords in table.items()}
+    try:
+        from knowledge_store import knowledge_store
+        for crop, aliases in knowledge_store.crop_names().items():
+            table.setdefault(("crop", crop), []).extend([crop, *aliases])
+    except Exception as e:
+        logger.warning(f"Knowledge store crops not available for routing: {e}")
+    return table
+
+# Initialize the intent router
+intent_router = IntentRouter(with_knowledge_crops(ROUTING_TABLE))
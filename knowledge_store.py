@@ -0,0 +1,201 @@
+"""
+Knowledge Store
+SQLite/FTS5 store for crop guidance and farming notes, built from CSV/JSON files
+
+Build or rebuild it with:
+    python knowledge_store.py Data/knowledge/crops.csv Data/knowledge/notes.json -o knowledge.sqlite
+"""
+
+import os
+import csv
+import json
+import sqlite3
+import logging
+import argparse
+import threading
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+KNOWLEDGE_DB_PATH = os.getenv("AGRI_KNOWLEDGE_DB", "knowledge.sqlite")
+KNOWLEDGE_SOURCES = ("Data/knowledge/crops.csv", "Data/knowledge/notes.json")
+CROP_FIELDS = ("crop", "region", "season", "aliases", "planting_season", "harvest_time", "soil_type", "watering", "guide")
+# Rows that apply to every region / season
+ANY_REGION = "all"
+
+SCHEMA = """
+CREATE TABLE crops (
+    id INTEGER PRIMARY KEY,
+    crop TEXT NOT NULL,
+    region TEXT NOT NULL,
+    season TEXT NOT NULL,
+    aliases TEXT NOT NULL,
+    planting_season TEXT,
+    harvest_time TEXT,
+    soil_type TEXT,
+    watering TEXT,
+    guide TEXT,
+    UNIQUE (crop, region, season)
+);
+CREATE TABLE notes (
+    section TEXT NOT NULL,
+    key TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (section, key, position)
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE crops_fts USING fts5(crop, region, season, content='crops', content_rowid='id');
+"""
+
+def _load_source(path):
+    """Return (crop rows, note rows) from one CSV or JSON file"""
+    crops, notes = [], []
+    if path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8", newline="") as file:
+            rows = list(csv.DictReader(file))
+    else:
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+        if isinstance(data, dict):
+            # {section: {key: [body, ...]}}
+            for section, keys in data.items():
+                for key, bodies in keys.items():
+                    bodies = [bodies] if isinstance(bodies, str) else bodies
+                    notes.extend({"section": section, "key": key, "position": i, "body": body}
+                                 for i, body in enumerate(bodies))
+            return crops, notes
+        rows = data
+    for row in rows:
+        if "section" in row:
+            notes.append({"section": row["section"], "key": row["key"],
+                          "position": int(row.get("position") or 0), "body": row["body"]})
+        else:
+            crops.append(row)
+    return crops, notes
+
+def build_knowledge_store(sources=KNOWLEDGE_SOURCES, path=KNOWLEDGE_DB_PATH):
+    """Build the store from CSV/JSON sources into a new file and swap it in atomically"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(SCHEMA)
+        crop_count = note_count = 0
+        for source in sources:
+            crops, notes = _load_source(source)
+            conn.executemany(
+                "INSERT OR REPLACE INTO crops (crop, region, season, aliases, planting_season, harvest_time, soil_type, watering, guide) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(row["crop"].strip().lower(), (row.get("region") or ANY_REGION).strip().lower(),
+                  (row.get("season") or "").strip().lower(), row.get("aliases") or "",
+                  *(row.get(field) for field in CROP_FIELDS[4:])) for row in crops]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO notes (section, key, position, body) VALUES (:section, :key, :position, :body)",
+                notes
+            )
+            crop_count += len(crops)
+            note_count += len(notes)
+        conn.execute("INSERT INTO crops_fts (crops_fts) VALUES ('rebuild')")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, path)
+    logger.info(f"Built knowledge store {path} with {crop_count} crop rows and {note_count} notes")
+
+class KnowledgeStore:
+    """
+    Read-only access to the knowledge database.
+
+    Each thread (and so each worker) opens its own connection on first use;
+    the file is (re)built from KNOWLEDGE_SOURCES when it is missing or older
+    than them. Every lookup is a primary-key, index or FTS5 probe, so
+    answering costs the same however many crops, regions and seasons the
+    store holds. Rows for one crop are told apart by the region and season
+    words of the question.
+    """
+
+    def __init__(self, path=KNOWLEDGE_DB_PATH, sources=KNOWLEDGE_SOURCES):
+        self.path = path
+        self.sources = sources
+        self._local = threading.local()
+        self._build_lock = threading.Lock()
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._build_lock:
+                if self._is_stale():
+                    build_knowledge_store(self.sources, self.path)
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _is_stale(self):
+        """True when the database is missing or older than one of its source files"""
+        if not os.path.exists(self.path):
+            return True
+        built = os.path.getmtime(self.path)
+        return any(os.path.exists(source) and os.path.getmtime(source) > built for source in self.sources)
+
+    def crop_names(self):
+        """{crop: [aliases]} for every crop in the store"""
+        names = {}
+        for row in self._connect().execute("SELECT crop, aliases FROM crops"):
+            aliases = names.setdefault(row["crop"], [])
+            aliases.extend(alias.strip() for alias in row["aliases"].split(";") if alias.strip())
+        return {crop: sorted(set(aliases)) for crop, aliases in names.items()}
+
+    def crop_rows(self):
+        """(crop, region, season) of every crop row"""
+        return [tuple(row) for row in self._connect().execute("SELECT crop, region, season FROM crops ORDER BY id")]
+
+    def crop(self, crop, query=None):
+        """The row for `crop` that best matches the regions/seasons named in `query`, or None"""
+        conn = self._connect()
+        if query:
+            terms = [term for term in "".join(c if c.isalnum() else " " for c in query.lower()).split() if len(term) > 2]
+            if terms:
+                match = 'crop : "{}" AND {{region season}} : ({})'.format(
+                    crop.replace('"', '""'), " OR ".join(f'"{term}"' for term in terms))
+                row = conn.execute(
+                    "SELECT crops.* FROM crops_fts JOIN crops ON crops.id = crops_fts.rowid "
+                    "WHERE crops_fts MATCH ? ORDER BY rank LIMIT 1",
+                    (match,)
+                ).fetchone()
+                if row is not None:
+                    return dict(row)
+        row = conn.execute(
+            "SELECT * FROM crops WHERE crop = ? ORDER BY region != ?, season != '' LIMIT 1",
+            (crop, ANY_REGION)
+        ).fetchone()
+        return dict(row) if row is not None else None
+
+    def notes(self, section, key):
+        """The note bodies filed under `section`/`key`, in order"""
+        return [row["body"] for row in self._connect().execute(
+            "SELECT body FROM notes WHERE section = ? AND key = ? ORDER BY position", (section, key)
+        )]
+
+    def note(self, section, key):
+        """The first note under `section`/`key`, or None"""
+        notes = self.notes(section, key)
+        return notes[0] if notes else None
+
+    def keys(self, section):
+        return [row["key"] for row in self._connect().execute(
+            "SELECT DISTINCT key FROM notes WHERE section = ? ORDER BY key", (section,)
+        )]
+
+# Initialize the knowledge store
+knowledge_store = KnowledgeStore()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Build the AgriGenius knowledge store from CSV/JSON files")
+    parser.add_argument("sources", nargs="*", default=list(KNOWLEDGE_SOURCES), help="crop CSV/JSON and note JSON/CSV files")
+    parser.add_argument("-o", "--output", default=KNOWLEDGE_DB_PATH, help="database file to write")
+    args = parser.parse_args()
+    build_knowledge_store(args.sources, args.output)
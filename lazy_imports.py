@@ -0,0 +1,143 @@
+"""
+Lazy Imports
+Deferred loading of heavy modules and a per-module import cost report for startup
+"""
+
+import sys
+import time
+import logging
+import builtins
+import importlib
+import threading
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Modules listed in the startup report
+REPORT_TOP = 15
+
+_UNSET = object()
+_builtin_import = builtins.__import__
+
+class ImportProfile:
+    """
+    Times every module imported between `start()` and `finish()`.
+
+    While active, `import` statements go through a thin wrapper around
+    builtins.__import__ that times the ones that actually load something.
+    Each module gets its cumulative time, and its self time with the
+    imports it triggered subtracted, like `python -X importtime`. Modules
+    loaded later through LazyObject are recorded as deferred loads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._active = False
+        self._started = None
+        self.startup_seconds = None
+        self.modules = {}   # name -> (cumulative seconds, self seconds)
+        self.deferred = {}  # name -> seconds
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return _builtin_import(name, globals, locals, fromlist, level)
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            return _builtin_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            with self._lock:
+                self.modules[name] = (elapsed, elapsed - children)
+
+    def start(self):
+        if not self._active:
+            self._active = True
+            self._started = time.perf_counter()
+            builtins.__import__ = self._import
+
+    def finish(self):
+        """Stop timing imports and log the startup report"""
+        if not self._active:
+            return
+        builtins.__import__ = _builtin_import
+        self._active = False
+        self.startup_seconds = time.perf_counter() - self._started
+        slowest = sorted(self.modules.items(), key=lambda item: item[1][1], reverse=True)[:REPORT_TOP]
+        logger.info(f"Startup imports took {self.startup_seconds * 1000:.0f} ms ({len(self.modules)} modules); slowest: "
+                    + ", ".join(f"{name} {own * 1000:.1f} ms" for name, (_, own) in slowest))
+
+    def record_deferred(self, name, seconds):
+        with self._lock:
+            self.deferred[name] = seconds
+
+    def stats(self):
+        with self._lock:
+            slowest = sorted(self.modules.items(), key=lambda item: item[1][1], reverse=True)[:REPORT_TOP]
+            return {
+                "startup_ms": round(self.startup_seconds * 1000, 1) if self.startup_seconds is not None else None,
+                "modules": len(self.modules),
+                "slowest_ms": {name: {"self": round(own * 1000, 1), "cumulative": round(total * 1000, 1)}
+                               for name, (total, own) in slowest},
+                "deferred_ms": {name: round(seconds * 1000, 1) for name, seconds in self.deferred.items()}
+            }
+
+class LazyObject:
+    """
+    Stands in for `module.attribute` and imports the module the first time
+    the object is used. Truth-testing it tells whether the import worked,
+    so `if multi_lang:` checks keep their meaning. A module that fails to
+    import is reported once and then behaves like a missing feature.
+    """
+
+    def __init__(self, module, attribute, profile=None):
+        self._lazy_module = module
+        self._lazy_attribute = attribute
+        self._lazy_profile = profile
+        self._lazy_lock = threading.Lock()
+        self._lazy_target = _UNSET
+
+    def _lazy_load(self):
+        if self._lazy_target is _UNSET:
+            with self._lazy_lock:
+                if self._lazy_target is _UNSET:
+                    started = time.perf_counter()
+                    try:
+                        target = getattr(importlib.import_module(self._lazy_module), self._lazy_attribute)
+                    except ImportError as e:
+                        logger.warning(f"{self._lazy_module} not available: {e}")
+                        target = None
+                    if self._lazy_profile is not None:
+                        self._lazy_profile.record_deferred(self._lazy_module, time.perf_counter() - started)
+                    self._lazy_target = target
+        return self._lazy_target
+
+    def __getattr__(self, name):
+        if name.startswith("_lazy_"):
+            raise AttributeError(name)
+        target = self._lazy_load()
+        if target is None:
+            raise AttributeError(f"{self._lazy_module} is not available")
+        return getattr(target, name)
+
+    def __call__(self, *args, **kwargs):
+        return self._lazy_load()(*args, **kwargs)
+
+    def __bool__(self):
+        return self._lazy_load() is not None
+
+def is_loaded(obj):
+    """True for a usable object, without triggering the import of a LazyObject that hasn't been used yet"""
+    if isinstance(obj, LazyObject):
+        return obj._lazy_target is not _UNSET and obj._lazy_target is not None
+    return obj is not None
+
+# Initialize the import profile
+import_profile = ImportProfile()
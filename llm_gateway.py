@@ -0,0 +1,232 @@
+"""
+LLM Gateway
+Pooled, concurrency-limited completion client with deadlines, jittered retries and queue metrics
+"""
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from collections import deque
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from langchain_core.language_models.llms import LLM
+    from langchain_core.outputs import GenerationChunk
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    LANGCHAIN_AVAILABLE = False
+    class LLM:
+        def __init__(self, **kwargs):
+            for key, value in kwargs.items():
+                setattr(self, key, value)
+        def invoke(self, prompt):
+            return self._call(prompt)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Point at a local fake completion server to test without the provider
+LLM_BASE_URL = os.getenv("AGRI_LLM_BASE_URL", "https://api.together.xyz/v1")
+LLM_MAX_CONCURRENCY = int(os.getenv("AGRI_LLM_MAX_CONCURRENCY", "8"))
+# Whole-call deadline in seconds: queueing, every attempt and the backoff between them
+LLM_TIMEOUT = float(os.getenv("AGRI_LLM_TIMEOUT", "30"))
+LLM_RETRIES = int(os.getenv("AGRI_LLM_RETRIES", "2"))
+CONNECT_TIMEOUT = 5.0
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+# Recent call latencies kept for percentiles
+_LATENCY_SAMPLES = 1000
+
+class LLMGatewayError(Exception):
+    """The completion could not be produced"""
+
+class LLMTimeoutError(LLMGatewayError):
+    """The call's deadline passed while waiting for a slot or for the provider"""
+
+class _RetryableError(Exception):
+    pass
+
+class LLMGateway:
+    """
+    Shared client for an OpenAI-style /completions endpoint.
+
+    One requests.Session with a connection pool as large as the concurrency
+    limit keeps provider connections alive between calls. A semaphore caps
+    the calls in flight; requests beyond it queue until a slot frees up or
+    their deadline passes, so a slow provider can hold at most
+    `max_concurrency` worker threads and only until the deadline. Failed
+    attempts that are safe to repeat (connection errors, timeouts, 429 and
+    5xx) are retried with full-jitter exponential backoff. A stream is only
+    retried before its first token.
+    """
+
+    def __init__(self, settings, api_key, base_url=LLM_BASE_URL, max_concurrency=LLM_MAX_CONCURRENCY,
+                 timeout=LLM_TIMEOUT, retries=LLM_RETRIES):
+        self.settings = dict(settings)
+        self.api_key = api_key
+        self.url = base_url.rstrip("/") + "/completions"
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._max_waiting = 0
+        self._counts = {"calls": 0, "attempts": 0, "retries": 0, "timeouts": 0, "failures": 0}
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self._queue_waits = deque(maxlen=_LATENCY_SAMPLES)
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _remaining(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._count("timeouts")
+            raise LLMTimeoutError("LLM call exceeded its deadline")
+        return remaining
+
+    def _acquire(self, deadline):
+        queued = time.monotonic()
+        with self._lock:
+            self._waiting += 1
+            self._max_waiting = max(self._max_waiting, self._waiting)
+        try:
+            acquired = self._slots.acquire(timeout=max(0.0, deadline - queued))
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            self._count("timeouts")
+            raise LLMTimeoutError("Timed out waiting for a free LLM slot")
+        with self._lock:
+            self._in_flight += 1
+            self._queue_waits.append(time.monotonic() - queued)
+
+    def _release(self):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _post(self, prompt, stream, deadline):
+        self._count("attempts")
+        payload = dict(self.settings, prompt=prompt, stream=stream)
+        headers = {"Authorization": f"Bearer {self.api_key}"}
+        remaining = self._remaining(deadline)
+        try:
+            response = self._session.post(self.url, json=payload, headers=headers, stream=stream,
+                                          timeout=(min(CONNECT_TIMEOUT, remaining), remaining))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise _RetryableError(str(e)) from e
+        if response.status_code in RETRY_STATUSES:
+            response.close()
+            raise _RetryableError(f"HTTP {response.status_code}")
+        if response.status_code >= 400:
+            response.close()
+            raise LLMGatewayError(f"LLM request failed with HTTP {response.status_code}: {response.text[:200]}")
+        return response
+
+    def _backoff(self, attempt, deadline):
+        # Full jitter keeps retries from many threads from arriving together
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            self._count("timeouts")
+            raise LLMTimeoutError("LLM call exceeded its deadline while retrying")
+        self._count("retries")
+        time.sleep(delay)
+
+    def _iter_text(self, response, deadline):
+        """Text pieces of a streamed response; the read timeout bounds each gap, the deadline the whole"""
+        response.encoding = "utf-8"
+        done = False
+        for line in response.iter_lines(decode_unicode=True):
+            self._remaining(deadline)
+            if done or not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                # Read on to the end of the body, or the connection can't go back to the pool
+                done = True
+                continue
+            choices = json.loads(data).get("choices") or [{}]
+            text = choices[0].get("text")
+            if text:
+                yield text
+
+    def stream(self, prompt, timeout=None):
+        """Yield the completion of `prompt` in pieces as the provider generates them"""
+        deadline = time.monotonic() + (timeout or self.timeout)
+        self._count("calls")
+        self._acquire(deadline)
+        started = time.monotonic()
+        try:
+            for attempt in range(self.retries + 1):
+                produced = False
+                try:
+                    with self._post(prompt, True, deadline) as response:
+                        for text in self._iter_text(response, deadline):
+                            produced = True
+                            yield text
+                    break
+                except (_RetryableError, requests.RequestException) as e:
+                    if produced or attempt == self.retries:
+                        raise LLMGatewayError(f"LLM stream failed: {e}") from e
+                    logger.warning(f"LLM attempt {attempt + 1} failed, retrying: {e}")
+                    self._backoff(attempt, deadline)
+            with self._lock:
+                self._latencies.append(time.monotonic() - started)
+        except Exception:
+            self._count("failures")
+            raise
+        finally:
+            self._release()
+
+    def complete(self, prompt, timeout=None):
+        """Return the whole completion of `prompt`"""
+        return "".join(self.stream(prompt, timeout=timeout))
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            queue_waits = sorted(self._queue_waits)
+            data = dict(self._counts)
+            data.update(in_flight=self._in_flight, queue_depth=self._waiting, max_queue_depth=self._max_waiting)
+
+        def percentile(values, p):
+            return round(values[min(len(values) - 1, int(p * len(values)))] * 1000, 1) if values else 0.0
+
+        data["latency_ms"] = {"p50": percentile(latencies, 0.5), "p95": percentile(latencies, 0.95)}
+        data["queue_wait_ms"] = {"p50": percentile(queue_waits, 0.5), "p95": percentile(queue_waits, 0.95)}
+        data["max_concurrency"] = self.max_concurrency
+        return data
+
+class GatewayLLM(LLM):
+    """LangChain LLM that sends every call through an LLMGateway"""
+
+    gateway: Any
+
+    @property
+    def _llm_type(self):
+        return "llm-gateway"
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        return self.gateway.complete(prompt)
+
+    def _stream(self, prompt, stop=None, run_manager=None, **kwargs):
+        for text in self.gateway.stream(prompt):
+            if run_manager is not None:
+                run_manager.on_llm_new_token(text)
+            yield GenerationChunk(text=text)
@@ -12,6 +12,9 @@ import logging
 logger = logging.getLogger(__name__)
 
 class MarketPriceAPI:
+    # Crops get_price_info has prices for; others would get the default (wheat) prices
+    covered_crops = frozenset({'wheat', 'rice', 'corn'})
+
     def __init__(self):
         self.apis = {
             'agmarknet': 'https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070',
@@ -129,6 +132,10 @@ class MarketPriceAPI:
             logger.error(f"Error formatting data: {e}")
             return None
     
+    def covers(self, crop_name):
+        """True when prices for this crop can be looked up"""
+        return crop_name.lower().strip() in self.covered_crops
+
     def get_price_info(self, crop_name, market="Delhi", use_mock=True):
         """
         Main function to get price information
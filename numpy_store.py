@@ -0,0 +1,307 @@
+"""
+NumPy Vector Store
+Exact in-process top-k search over a contiguous matrix with optional float16/int8 storage
+"""
+
+import os
+import json
+import logging
+from typing import Any, Optional
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+    from langchain_core.retrievers import BaseRetriever
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    LANGCHAIN_AVAILABLE = False
+    class Document:
+        def __init__(self, page_content, metadata=None):
+            self.page_content = page_content
+            self.metadata = metadata or {}
+    class BaseRetriever:
+        def __init__(self, **kwargs):
+            for key, value in kwargs.items():
+                setattr(self, key, value)
+        def invoke(self, query):
+            return self._get_relevant_documents(query)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+VECTOR_DTYPE = os.getenv("AGRI_VECTOR_DTYPE", "float16")
+# Rows scored per matrix multiplication; bounds the float32 scratch space for int8/float16
+BLOCK_ROWS = 8192
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+class NumpyVectorStore:
+    """
+    Vector store with the subset of the Chroma API this app uses.
+
+    Vectors sit in one contiguous matrix stored as float32, float16 (half
+    the memory) or int8 with a float32 scale per row (about a quarter).
+    Search converts one block of rows at a time to float32 and multiplies
+    it by the whole query batch, so scratch memory stays at BLOCK_ROWS rows
+    and all queries share one pass over the matrix. Scores are dot
+    products, i.e. cosine similarity for normalised embeddings.
+    """
+
+    def __init__(self, embedding_function, dtype=VECTOR_DTYPE, block_rows=BLOCK_ROWS):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported vector dtype {dtype!r}, use one of {SUPPORTED_DTYPES}")
+        self.embedding_function = embedding_function
+        self.dtype = dtype
+        self.block_rows = block_rows
+        self._vectors = None
+        self._scales = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self.texts = []
+        self.metadatas = []
+        self.ids = []
+        self._row_of = {}
+        # Set by adds and deletes; save() is a no-op while the store matches what is on disk
+        self.dirty = False
+
+    def __len__(self):
+        return len(self._row_of)
+
+    @property
+    def nbytes(self):
+        """Memory held by the vectors and scales"""
+        size = self._vectors.nbytes if self._vectors is not None else 0
+        return size + (self._scales.nbytes if self._scales is not None else 0)
+
+    def _encode(self, vectors):
+        if self.dtype == "int8":
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors.astype(self.dtype), None
+
+    def _reserve(self, rows, dim):
+        """Grow storage geometrically, copying a read-only memory map on first write"""
+        if self._vectors is None:
+            capacity = max(rows, 1024)
+            self._vectors = np.zeros((capacity, dim), dtype=self.dtype)
+            self._scales = np.ones(capacity, dtype=np.float32) if self.dtype == "int8" else None
+            self._alive = np.zeros(capacity, dtype=bool)
+            return
+        if self._vectors.shape[1] != dim:
+            raise ValueError(f"Embedding size {dim} does not match store size {self._vectors.shape[1]}")
+        needed = self._size + rows
+        capacity = self._vectors.shape[0]
+        if needed <= capacity and self._vectors.flags.writeable:
+            return
+        if needed > capacity:
+            capacity = max(capacity * 2, needed)
+        vectors = np.zeros((capacity, dim), dtype=self.dtype)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        if self._scales is not None:
+            scales = np.ones(capacity, dtype=np.float32)
+            scales[:self._size] = self._scales[:self._size]
+            self._scales = scales
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._alive = alive
+
+    def add_vectors(self, vectors, texts, metadatas=None, ids=None):
+        """Insert or replace rows; like Chroma's upsert an existing id is overwritten"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(texts):
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(self._size + i) for i in range(len(texts))]
+        encoded, scales = self._encode(vectors)
+        self._reserve(len(texts), vectors.shape[1])
+
+        for i, (text, metadata, doc_id) in enumerate(zip(texts, metadatas, ids)):
+            row = self._row_of.get(doc_id)
+            if row is None:
+                row = self._size
+                self._size += 1
+                self.texts.append(text)
+                self.metadatas.append(metadata)
+                self.ids.append(doc_id)
+                self._row_of[doc_id] = row
+            else:
+                self.texts[row] = text
+                self.metadatas[row] = metadata
+            self._vectors[row] = encoded[i]
+            if scales is not None:
+                self._scales[row] = scales[i]
+            self._alive[row] = True
+        self.dirty = True
+        return ids
+
+    def add_texts(self, texts, metadatas=None, ids=None):
+        texts = list(texts)
+        return self.add_vectors(self.embedding_function.embed_documents(texts), texts, metadatas, ids)
+
+    def delete(self, ids=None):
+        for doc_id in ids or []:
+            row = self._row_of.pop(doc_id, None)
+            if row is not None:
+                self._alive[row] = False
+                self.texts[row] = ""
+                self.dirty = True
+        # Reclaim space once most of the matrix is dead rows
+        if self._size and len(self._row_of) < self._size // 2:
+            self._compact()
+
+    def _compact(self):
+        keep = np.flatnonzero(self._alive[:self._size])
+        self._vectors = np.ascontiguousarray(self._vectors[keep])
+        if self._scales is not None:
+            self._scales = self._scales[keep].copy()
+        self._alive = np.ones(len(keep), dtype=bool)
+        self.texts = [self.texts[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self.ids = [self.ids[row] for row in keep]
+        self._row_of = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._size = len(keep)
+
+    def search_vectors(self, queries, k=4, rows=None):
+        """
+        Exact top-k for a batch of query vectors.
+
+        Returns (row_indices, scores), both shaped (len(queries), k) and
+        sorted best first; missing results are -1 / -inf. `rows`, if given,
+        restricts scoring to those row indices.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_rows = np.full((len(queries), k), -1, dtype=np.int64)
+        if not self._size:
+            return best_rows, best_scores
+
+        candidates = np.arange(self._size) if rows is None else np.asarray(rows, dtype=np.int64)
+        for start in range(0, len(candidates), self.block_rows):
+            block_rows = candidates[start:start + self.block_rows]
+            if rows is None:
+                block = self._vectors[block_rows[0]:block_rows[-1] + 1]
+            else:
+                block = self._vectors[block_rows]
+            scores = block.astype(np.float32, copy=False) @ queries.T
+            if self._scales is not None:
+                scores *= self._scales[block_rows][:, None]
+            scores[~self._alive[block_rows]] = -np.inf
+            scores = scores.T
+
+            merged_scores = np.concatenate([best_scores, scores], axis=1)
+            merged_rows = np.concatenate([best_rows, np.broadcast_to(block_rows, scores.shape)], axis=1)
+            top = min(k, merged_scores.shape[1])
+            keep = np.argpartition(-merged_scores, top - 1, axis=1)[:, :top]
+            best_scores = np.take_along_axis(merged_scores, keep, axis=1)
+            best_rows = np.take_along_axis(merged_rows, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_rows[~np.isfinite(best_scores)] = -1
+        return best_rows, best_scores
+
+    def _documents(self, rows, scores, score_threshold=None):
+        results = []
+        for row, score in zip(rows, scores):
+            if row < 0 or (score_threshold is not None and score < score_threshold):
+                continue
+            metadata = dict(self.metadatas[row], id=self.ids[row])
+            results.append((Document(page_content=self.texts[row], metadata=metadata), float(score)))
+        return results
+
+    def similarity_search_by_vector_with_score(self, query_vector, k=4, score_threshold=None):
+        rows, scores = self.search_vectors([query_vector], k)
+        return self._documents(rows[0], scores[0], score_threshold)
+
+    def similarity_search_with_score(self, query, k=4, score_threshold=None):
+        return self.similarity_search_by_vector_with_score(self.embedding_function.embed_query(query), k, score_threshold)
+
+    # Dot products of normalised vectors already are relevance scores
+    similarity_search_with_relevance_scores = similarity_search_with_score
+
+    def similarity_search(self, query, k=4, score_threshold=None):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, score_threshold)]
+
+    def batch_similarity_search(self, queries, k=4, score_threshold=None):
+        """Search several queries with a single pass over the matrix"""
+        vectors = self.embedding_function.embed_documents(list(queries))
+        rows, scores = self.search_vectors(vectors, k)
+        return [[doc for doc, _ in self._documents(r, s, score_threshold)] for r, s in zip(rows, scores)]
+
+    def search_ids(self, query_vector, ids):
+        """Score only the given ids; returns (Document, score) pairs best first"""
+        rows = [self._row_of[doc_id] for doc_id in ids if doc_id in self._row_of]
+        if not rows:
+            return []
+        rows, scores = self.search_vectors([query_vector], k=len(rows), rows=rows)
+        return self._documents(rows[0], scores[0])
+
+    def as_retriever(self, search_kwargs=None, **kwargs):
+        search_kwargs = dict(search_kwargs or {})
+        return NumpyRetriever(
+            store=self,
+            k=search_kwargs.get("k", 4),
+            score_threshold=search_kwargs.get("score_threshold")
+        )
+
+    def save(self, directory):
+        """Write the store to `directory`, compacting deleted rows first; skipped when nothing changed"""
+        if not self.dirty:
+            return
+        if self._vectors is not None and len(self._row_of) < self._size:
+            self._compact()
+        os.makedirs(directory, exist_ok=True)
+        dim = self._vectors.shape[1] if self._vectors is not None else 0
+        arrays = {"vectors.npy": self._vectors if self._vectors is not None else np.zeros((0, 0), self.dtype)}
+        if self._scales is not None:
+            arrays["scales.npy"] = self._scales
+        for name, array in arrays.items():
+            tmp_path = os.path.join(directory, name + ".tmp")
+            with open(tmp_path, "wb") as file:
+                np.save(file, array[:self._size])
+            os.replace(tmp_path, os.path.join(directory, name))
+        tmp_path = os.path.join(directory, "documents.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"dtype": self.dtype, "dim": dim, "ids": self.ids,
+                       "texts": self.texts, "metadatas": self.metadatas}, file)
+        os.replace(tmp_path, os.path.join(directory, "documents.json"))
+        self.dirty = False
+
+    @classmethod
+    def load(cls, directory, embedding_function, dtype=VECTOR_DTYPE, block_rows=BLOCK_ROWS):
+        """Open a saved store memory-mapped, or an empty one if none exists"""
+        store = cls(embedding_function, dtype=dtype, block_rows=block_rows)
+        try:
+            with open(os.path.join(directory, "documents.json"), "r", encoding="utf-8") as file:
+                documents = json.load(file)
+        except FileNotFoundError:
+            return store
+        if documents["dtype"] != dtype:
+            raise ValueError(f"Saved store uses {documents['dtype']}, expected {dtype}")
+        if not documents["ids"]:
+            return store
+
+        store._vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        if dtype == "int8":
+            store._scales = np.load(os.path.join(directory, "scales.npy"))
+        store._size = len(documents["ids"])
+        store._alive = np.ones(store._size, dtype=bool)
+        store.ids = documents["ids"]
+        store.texts = documents["texts"]
+        store.metadatas = documents["metadatas"]
+        store._row_of = {doc_id: row for row, doc_id in enumerate(store.ids)}
+        logger.info(f"Loaded {store._size} vectors ({dtype}, {store.nbytes / (1024 * 1024):.1f}MB) from {directory}")
+        return store
+
+class NumpyRetriever(BaseRetriever):
+    """LangChain retriever over a NumpyVectorStore"""
+
+    store: Any
+    k: int = 4
+    score_threshold: Optional[float] = None
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.store.similarity_search(query, k=self.k, score_threshold=self.score_threshold)
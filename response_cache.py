@@ -0,0 +1,182 @@
+"""
+Response Cache
+Exact-match /ask responses shared by all workers through SQLite, with in-flight coalescing
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_PATH = os.getenv("AGRI_RESPONSE_CACHE_PATH", "response_cache.sqlite")
+RESPONSE_CACHE_TTL = float(os.getenv("AGRI_RESPONSE_CACHE_TTL", "3600"))
+# How long other workers wait on a computation before taking it over
+COMPUTE_LEASE = 120.0
+POLL_INTERVAL = 0.05
+_PURGE_EVERY = 200
+
+_SPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?!.,;:।॥؟。？！]+$")
+
+def normalize_query(query):
+    """Fold case, Unicode forms, whitespace and trailing punctuation"""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = _SPACE_RE.sub(" ", query).strip()
+    return _TRAILING_PUNCT_RE.sub("", query)
+
+class ResponseCache:
+    """
+    Cross-process cache of complete /ask responses.
+
+    Every Gunicorn worker opens the same SQLite file. A miss inserts a
+    pending row as a lease before computing; an identical request arriving
+    meanwhile, in any worker, polls that row instead of running detection,
+    translation and the LLM a second time. If the owner fails the lease is
+    released, and if it dies the lease expires and a waiter takes over.
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_PATH, ttl=RESPONSE_CACHE_TTL, lease=COMPUTE_LEASE):
+        self.path = path
+        self.ttl = ttl
+        self.lease = lease
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._puts = 0
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT, created REAL NOT NULL, pending_until REAL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def make_key(self, query, index_version):
+        # Detected language is a function of the query text, so it is part of the value
+        return hashlib.sha256(f"{index_version}\0{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def _count(self, name):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _try_claim(self, conn, key, now):
+        """Return ("hit", value), ("wait", None) or ("owner", None) after taking the lease"""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT value, created, pending_until FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                value, created, pending_until = row
+                if value is not None and now - created <= self.ttl:
+                    status = ("hit", value)
+                elif value is None and pending_until and pending_until > now:
+                    status = ("wait", None)
+                else:
+                    status = None
+                if status:
+                    conn.execute("COMMIT")
+                    return status
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, pending_until) VALUES (?, NULL, ?, ?)",
+                (key, now, now + self.lease)
+            )
+            conn.execute("COMMIT")
+            return ("owner", None)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get_or_compute(self, query, index_version, compute, cacheable=None):
+        """
+        Return the cached response for `query`, computing it at most once
+        across workers. A computed value for which `cacheable(value)` is
+        false is returned but not stored, and waiting requests recompute.
+        """
+        key = self.make_key(query, index_version)
+        conn = self._connect()
+        waited = False
+        while True:
+            status, value = self._try_claim(conn, key, time.time())
+            if status == "hit":
+                self._count("coalesced" if waited else "hits")
+                return json.loads(value)
+            if status == "owner":
+                break
+            waited = True
+            time.sleep(POLL_INTERVAL)
+
+        self._count("misses")
+        try:
+            value = compute()
+        except BaseException:
+            # Release the lease so a waiting request can retry
+            conn.execute("DELETE FROM responses WHERE key = ? AND value IS NULL", (key,))
+            raise
+        if cacheable is not None and not cacheable(value):
+            conn.execute("DELETE FROM responses WHERE key = ? AND value IS NULL", (key,))
+            return value
+        conn.execute(
+            "UPDATE responses SET value = ?, created = ?, pending_until = NULL WHERE key = ?",
+            (json.dumps(value, ensure_ascii=False), time.time(), key)
+        )
+        self._maybe_purge(conn)
+        return value
+
+    def get(self, query, index_version):
+        """Return a finished cached response, or None; never waits on or claims a computation"""
+        row = self._connect().execute(
+            "SELECT value, created FROM responses WHERE key = ?", (self.make_key(query, index_version),)
+        ).fetchone()
+        if row is not None and row[0] is not None and time.time() - row[1] <= self.ttl:
+            self._count("hits")
+            return json.loads(row[0])
+        self._count("misses")
+        return None
+
+    def put(self, query, index_version, value):
+        """Store a response that was computed outside `get_or_compute`, e.g. a streamed one"""
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, created, pending_until) VALUES (?, ?, ?, NULL)",
+            (self.make_key(query, index_version), json.dumps(value, ensure_ascii=False), time.time())
+        )
+        self._maybe_purge(conn)
+
+    def _maybe_purge(self, conn):
+        with self._stats_lock:
+            self._puts += 1
+            purge = self._puts % _PURGE_EVERY == 0
+        if purge:
+            now = time.time()
+            conn.execute(
+                "DELETE FROM responses WHERE (value IS NOT NULL AND created < ?) OR pending_until < ?",
+                (now - self.ttl, now)
+            )
+
+    def stats(self):
+        with self._stats_lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "hit_rate": round((self.hits + self.coalesced) / total, 4) if total else 0.0
+            }
+
+# Initialize the response cache
+response_cache = ResponseCache()
@@ -0,0 +1,125 @@
+"""
+Response Catalog
+Fallback answers translated ahead of time into every supported language
+
+Build it (needs the translation service) with:
+    python response_catalog.py -o response_catalog.json
+"""
+
+import os
+import json
+import hashlib
+import logging
+import argparse
+import threading
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+RESPONSE_CATALOG_PATH = os.getenv("AGRI_RESPONSE_CATALOG", "response_catalog.json")
+
+# Fixed answers given outside the knowledge base (used by app.py)
+DEVELOPER_ANSWER = "I was developed by Jayesh Bhandarkar."
+EMPTY_QUERY_ANSWER = "Please enter a question."
+ERROR_ANSWER = "I apologize, but I'm experiencing technical difficulties. Please try asking your agriculture question again, or consult with local farming experts for immediate assistance."
+FIXED_RESPONSES = (DEVELOPER_ANSWER, EMPTY_QUERY_ANSWER, ERROR_ANSWER)
+
+def text_key(text):
+    """Catalog key of an English answer; edited answers get new keys and fall back to live translation"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+def fallback_responses():
+    """Every English answer the knowledge-base fallbacks can give, found by routing probe questions"""
+    from intent_router import ROUTING_TABLE
+    from knowledge_store import knowledge_store
+    from agri_knowledge import agri_knowledge, get_smart_agriculture_response
+
+    # One probe per topic, per topic and modifier, and per crop row; market answers carry live prices
+    topics = [keywords[0].rstrip("*") for (kind, _), keywords in ROUTING_TABLE.items() if kind == "topic"]
+    modifiers = [keywords[0].rstrip("*") for (kind, _), keywords in ROUTING_TABLE.items() if kind == "modifier"]
+    probes = ["", "general tips"] + topics + [f"{topic} {modifier}" for topic in topics for modifier in modifiers]
+    probes += [" ".join(part for part in row if part) for row in knowledge_store.crop_rows()]
+
+    responses = set(FIXED_RESPONSES)
+    for probe in probes:
+        for answer in (agri_knowledge.search_advice(probe), get_smart_agriculture_response(probe)):
+            if answer:
+                responses.add(answer)
+    return sorted(responses)
+
+def build_response_catalog(translate, languages, path=RESPONSE_CATALOG_PATH):
+    """Translate every fallback answer into `languages` with `translate(text, language)` and write the catalog"""
+    responses = fallback_responses()
+    catalog = {"version": 1, "languages": {}}
+    for language in languages:
+        if language == "en":
+            continue
+        catalog["languages"][language] = {text_key(text): translate(text, language) for text in responses}
+        logger.info(f"Translated {len(responses)} responses into {language}")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(catalog, file, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    logger.info(f"Wrote response catalog {path} ({len(responses)} responses, {len(catalog['languages'])} languages)")
+
+class ResponseCatalog:
+    """
+    Read side of the catalog.
+
+    The JSON file is loaded once, on first use, into one dict per language
+    keyed by the hash of the English answer, so a lookup is two dict probes
+    and no translation call. Answers missing from the catalog (or a missing
+    file) return None and the caller translates live.
+    """
+
+    def __init__(self, path=RESPONSE_CATALOG_PATH):
+        self.path = path
+        self._languages = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self._languages is None:
+            with self._lock:
+                if self._languages is None:
+                    try:
+                        with open(self.path, "r", encoding="utf-8") as file:
+                            self._languages = json.load(file)["languages"]
+                        logger.info(f"Loaded response catalog with {len(self._languages)} languages")
+                    except FileNotFoundError:
+                        logger.info(f"No response catalog at {self.path}, fallback answers are translated live")
+                        self._languages = {}
+        return self._languages
+
+    def get(self, text, language):
+        """The precomputed translation of `text`, or None"""
+        translated = self._load().get(language, {}).get(text_key(text))
+        if translated is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return translated
+
+    def stats(self):
+        languages = self._load()
+        return {
+            "languages": len(languages),
+            "entries": sum(len(entries) for entries in languages.values()),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+# Initialize the response catalog
+response_catalog = ResponseCatalog()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    from translator import multi_lang
+
+    parser = argparse.ArgumentParser(description="Pre-translate the fallback answers into every supported language")
+    parser.add_argument("-o", "--output", default=RESPONSE_CATALOG_PATH, help="catalog file to write")
+    parser.add_argument("-l", "--languages", nargs="*", default=list(multi_lang.supported_languages),
+                        help="language codes (default: all supported)")
+    args = parser.parse_args()
+    build_response_catalog(multi_lang.enhance_agricultural_translation, args.languages, args.output)
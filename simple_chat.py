@@ -3,6 +3,22 @@ def simple_initialize_vector_store(contents):
     """Simple fallback that always returns None but doesn't crash"""
     return None
 
+def simple_sync_vector_store(sources, progress=None):
+    """Simple fallback that always returns None but doesn't crash"""
+    return None
+
+def simple_content_hash(data):
+    """Simple content hash used to identify sources"""
+    import hashlib
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+def simple_file_hash(path):
+    """Simple file hash used to identify sources"""
+    with open(path, "rb") as file:
+        return simple_content_hash(file.read())
+
 def simple_setup_retrieval_qa(db):
     """Simple fallback that always returns None but doesn't crash"""  
     return None
@@ -16,6 +32,10 @@ def simple_fetch_website_content(url):
     except:
         return ""
 
+def simple_fetch_websites(urls):
+    """Simple sequential fetcher for several websites"""
+    return {url: simple_fetch_website_content(url) for url in urls}
+
 def simple_extract_pdf_text(pdf_file):
     """Simple PDF text extractor"""
     try:
@@ -29,8 +49,19 @@ def simple_extract_pdf_text(pdf_file):
     except:
         return ""
 
+def simple_extract_pdf_pages(pdf_file):
+    """Simple PDF page streamer"""
+    text = simple_extract_pdf_text(pdf_file)
+    if text:
+        yield text
+
 # These will always be available
 fetch_website_content = simple_fetch_website_content
+fetch_websites = simple_fetch_websites
 extract_pdf_text = simple_extract_pdf_text
+extract_pdf_pages = simple_extract_pdf_pages
 initialize_vector_store = simple_initialize_vector_store
+sync_vector_store = simple_sync_vector_store
+content_hash = simple_content_hash
+file_hash = simple_file_hash
 setup_retrieval_qa = simple_setup_retrieval_qa
@@ -28,7 +28,7 @@ $(function() {
         });
     }
 
-    function appendMessage(message, isUser) {
+    function createMessage(isUser) {
         var messageClass = isUser ? 'user-message' : 'bot-message';
         var logoHTML = isUser ? '' : '<div class="bot-logo"><img src="../static/robo.png" alt="AgriGenius Logo"></div>';
         var userImageHTML = isUser ? '<div class="user-image"><img src="../static/user.png" alt="User"></div>' : '';
@@ -38,28 +38,31 @@ $(function() {
                             userImageHTML +
                            '</div>');
         $('.chat-messages').append(messageElement);
+        return messageElement.find('.message');
+    }
 
-        if (isUser) {
-            messageElement.find('.message').text(message);
-        } else {
-            typeMessage(message, messageElement.find('.message'));
-        }
+    function appendMessage(message, isUser) {
+        appendText(createMessage(isUser), message);
+    }
 
-        $('.chat-messages').scrollTop($('.chat-messages')[0].scrollHeight);
+    // Append a chunk as a new text node; the existing content is never re-parsed
+    function appendText(element, text) {
+        element[0].appendChild(document.createTextNode(text));
+        scrollToBottom();
     }
 
-    function typeMessage(message, element, speed = 15) {
-        let i = 0;
-        element.html('');
-        const typingInterval = setInterval(() => {
-            if (i < message.length) {
-                element.html(element.html() + message.charAt(i));
-                i++;
-            } else {
-                clearInterval(typingInterval);
-            }
-            $('.chat-messages').scrollTop($('.chat-messages')[0].scrollHeight);
-        }, speed);
+    // Scroll at most once per frame however many chunks arrive
+    var scrollPending = false;
+    function scrollToBottom() {
+        if (scrollPending) {
+            return;
+        }
+        scrollPending = true;
+        window.requestAnimationFrame(function() {
+            scrollPending = false;
+            var messages = $('.chat-messages')[0];
+            messages.scrollTop = messages.scrollHeight;
+        });
     }
 
     function showTypingIndicator() {
@@ -108,54 +111,116 @@ $(function() {
             $('#messageText').val('');
             showTypingIndicator();
 
-            $.ajax({
-                type: "POST",
-                url: "/ask",
-                data: { 
-                    messageText: message
-                },
-                success: function(response) {
-                    removeTypingIndicator();
-                    if (response.error) {
-                        appendMessage("Error: " + response.error, false);
-                    } else {
-                        var answer = response.answer;
-                        appendMessage(answer, false);
-
-                        // Update detected language if provided in response
-                        if (response.detectedLanguage) {
-                            detectedLanguage = response.detectedLanguage;
-                            
-                            // Update speech synthesis language
-                            var availableVoices = synth.getVoices();
-                            for (var i = 0; i < availableVoices.length; i++) {
-                                if (availableVoices[i].lang.startsWith(detectedLanguage)) {
-                                    msg.voice = availableVoices[i];
-                                    break;
-                                }
-                            }
-                        }
+            var botMessage = null;
+            function finish() {
+                removeTypingIndicator();
+                isProcessing = false;
+                enableInput();
+            }
 
-                        if ($('#voiceReadingCheckbox').is(':checked')) {
-                            msg.text = answer;
-                            msg.lang = detectedLanguage;
-                            synth.speak(msg);
-                        }
+            streamAnswer(message, {
+                meta: function(data) {
+                    // Update detected language if provided in response
+                    if (data.detectedLanguage) {
+                        setDetectedLanguage(data.detectedLanguage);
+                    }
+                },
+                token: function(text) {
+                    if (!botMessage) {
+                        removeTypingIndicator();
+                        botMessage = createMessage(false);
+                    }
+                    appendText(botMessage, text);
+                },
+                done: function(data) {
+                    if (botMessage) {
+                        botMessage[0].normalize();
                     }
-                    isProcessing = false;
-                    enableInput();
+                    if ($('#voiceReadingCheckbox').is(':checked')) {
+                        msg.text = data.answer;
+                        msg.lang = detectedLanguage;
+                        synth.speak(msg);
+                    }
+                    finish();
                 },
-                error: function(jqXHR, textStatus, errorThrown) {
+                error: function(data) {
                     removeTypingIndicator();
-                    console.log(errorThrown);
-                    appendMessage("Sorry, there was an error processing your request. Please try again later.", false);
-                    isProcessing = false;
-                    enableInput();
+                    appendMessage(data.answer, false);
+                    finish();
                 }
+            }).catch(function(error) {
+                console.log(error);
+                removeTypingIndicator();
+                appendMessage("Sorry, there was an error processing your request. Please try again later.", false);
+                finish();
             });
         }
     }
 
+    function setDetectedLanguage(language) {
+        detectedLanguage = language;
+
+        // Update speech synthesis language
+        var availableVoices = synth.getVoices();
+        for (var i = 0; i < availableVoices.length; i++) {
+            if (availableVoices[i].lang.startsWith(detectedLanguage)) {
+                msg.voice = availableVoices[i];
+                break;
+            }
+        }
+    }
+
+    // POST the question to /ask/stream and dispatch each Server-Sent Event to handlers[event]
+    function streamAnswer(message, handlers) {
+        return fetch('/ask/stream', {
+            method: 'POST',
+            body: new URLSearchParams({ messageText: message })
+        }).then(function(response) {
+            if (!response.ok || !response.body) {
+                throw new Error('Streaming request failed with status ' + response.status);
+            }
+            var reader = response.body.getReader();
+            var decoder = new TextDecoder();
+            var buffer = '';
+            var finished = false;
+
+            function dispatch(block) {
+                var event = 'message';
+                var data = [];
+                block.split('\n').forEach(function(line) {
+                    if (line.indexOf('event:') === 0) {
+                        event = line.slice(6).trim();
+                    } else if (line.indexOf('data:') === 0) {
+                        data.push(line.slice(5).replace(/^ /, ''));
+                    }
+                });
+                if (data.length && handlers[event]) {
+                    if (event === 'done' || event === 'error') {
+                        finished = true;
+                    }
+                    handlers[event](JSON.parse(data.join('\n')));
+                }
+            }
+
+            function read() {
+                return reader.read().then(function(result) {
+                    buffer += decoder.decode(result.value || new Uint8Array(), { stream: !result.done });
+                    var blocks = buffer.split('\n\n');
+                    buffer = blocks.pop();
+                    blocks.forEach(dispatch);
+                    if (result.done) {
+                        if (!finished) {
+                            throw new Error('Stream ended before the answer was complete');
+                        }
+                        return;
+                    }
+                    return read();
+                });
+            }
+            return read();
+        });
+    }
+
     $('#chatbot-form-btn-clear').click(function(e) {
         e.preventDefault();
         $('.chat-messages').empty();
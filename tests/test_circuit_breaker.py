@@ -0,0 +1,93 @@
+"""Circuit breaker against a local stand-in server with injected delays"""
+
+import time
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CallTimeoutError, CLOSED, OPEN
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        # /slow waits for the server's injected delay, /fail answers 500, anything else 200
+        if self.path == "/slow":
+            time.sleep(self.server.delay)
+        status = 500 if self.path == "/fail" else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.delay = 1.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def fetch(server, path):
+    with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}{path}", timeout=5) as response:
+        return response.read()
+
+def wait_for(condition, seconds=2.0):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_successful_calls_are_counted(server):
+    breaker = CircuitBreaker("stand-in", timeout=1.0)
+    assert breaker.call(fetch, server, "/ok") == b"ok"
+    stats = breaker.stats()
+    assert stats["successes"] == 1 and stats["state"] == CLOSED
+
+def test_full_timeouts_open_the_circuit(server):
+    breaker = CircuitBreaker("stand-in", failure_threshold=2, reset_timeout=60, timeout=0.1)
+    for _ in range(2):
+        with pytest.raises(CallTimeoutError):
+            breaker.call(fetch, server, "/slow")
+    assert breaker.state == OPEN
+    started = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        breaker.call(fetch, server, "/ok")
+    assert time.monotonic() - started < 0.05
+    assert breaker.stats()["timeouts"] == 2 and breaker.stats()["rejected"] == 1
+
+def test_errors_open_the_circuit(server):
+    breaker = CircuitBreaker("stand-in", failure_threshold=2, reset_timeout=60, timeout=1.0)
+    for _ in range(2):
+        with pytest.raises(Exception):
+            breaker.call(fetch, server, "/fail")
+    assert breaker.state == OPEN
+    assert breaker.stats()["failures"] == 2
+
+def test_budget_shortened_timeouts_are_not_failures(server):
+    breaker = CircuitBreaker("stand-in", failure_threshold=2, reset_timeout=60, timeout=1.0)
+    for _ in range(3):
+        with pytest.raises(CallTimeoutError):
+            breaker.call(fetch, server, "/slow", timeout=0.05)
+    stats = breaker.stats()
+    assert stats["state"] == CLOSED
+    assert stats["consecutive_failures"] == 0 and stats["timeouts"] == 0 and stats["cut_short"] == 3
+
+def test_probe_closes_the_circuit_while_calls_are_hung(server):
+    server.delay = 2.0
+    breaker = CircuitBreaker("stand-in", probe=lambda: fetch(server, "/ok"), failure_threshold=2,
+                             reset_timeout=0.1, timeout=0.2, max_workers=2)
+    for _ in range(2):
+        with pytest.raises(CallTimeoutError):
+            breaker.call(fetch, server, "/slow")
+    assert breaker.state == OPEN
+    # Both call threads are still waiting on /slow; the probe must not queue behind them
+    assert wait_for(lambda: breaker.state == CLOSED, seconds=1.0)
+    assert breaker.stats()["opened"] == 1
@@ -0,0 +1,31 @@
+"""Script and short-text language detection"""
+
+import pytest
+
+from language_detect import detect_language
+
+@pytest.mark.parametrize("query, expected", [
+    ("गेहूं का भाव क्या है", "hi"),
+    ("पिकांची माहिती कुठे मिळेल", "mr"),
+    ("گندم کی قیمت کیا ہے", "ur"),
+    ("ما هو سعر القمح", "ar"),
+    ("小麦の価格はいくらですか", "ja"),
+    ("小麦的价格是多少", "zh"),
+    ("Какова цена пшеницы", "ru"),
+])
+def test_script_decides_non_latin_languages(query, expected):
+    assert detect_language(query) == expected
+
+@pytest.mark.parametrize("query, expected", [
+    ("wheat price", "en"),
+    ("rice price today", "en"),
+    ("precio del trigo", "es"),
+    ("cosecha de maíz", "es"),
+    ("prix du blé", "fr"),
+    ("engrais pour riz", "fr"),
+    ("Weizenpreis heute", "de"),
+    ("prezzo del grano", "it"),
+    ("preço do trigo", "pt"),
+])
+def test_short_latin_queries_are_not_forced_to_english(query, expected):
+    assert detect_language(query) == expected
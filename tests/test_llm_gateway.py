@@ -0,0 +1,176 @@
+"""LLM gateway against a local fake completion server"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Needs requests
+llm_gateway = pytest.importorskip("llm_gateway")
+from llm_gateway import LLMGateway, LLMGatewayError, LLMTimeoutError
+
+SETTINGS = {"model": "fake-model", "max_tokens": 16}
+
+def sse_events(pieces):
+    events = [f"data: {json.dumps({'choices': [{'text': piece}]})}\n\n" for piece in pieces]
+    return [event.encode("utf-8") for event in events + ["data: [DONE]\n\n"]]
+
+class FakeCompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests.append({"path": self.path, "payload": payload, "headers": dict(self.headers),
+                                    "client": self.client_address})
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+            behaviour = server.script.pop(0) if server.script else server.default
+        try:
+            time.sleep(behaviour.get("delay", 0))
+            status = behaviour.get("status", 200)
+            if status != 200:
+                body = b'{"error": "fake"}'
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            # Streamed like the provider does: one HTTP chunk per event
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            events = sse_events(behaviour.get("pieces", ["Hello", " farmer"]))
+            for i, event in enumerate(events):
+                if i == behaviour.get("cut_after"):
+                    # Drop the connection mid-stream, without the terminating chunk
+                    self.close_connection = True
+                    return
+                self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+                self.wfile.flush()
+                time.sleep(behaviour.get("gap", 0))
+            self.wfile.write(b"0\r\n\r\n")
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCompletionHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.script = []
+    server.default = {}
+    server.active = 0
+    server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(llm_gateway, "BACKOFF_BASE", 0.01)
+
+def make_gateway(server, **kwargs):
+    return LLMGateway(SETTINGS, "test-key", base_url=f"http://127.0.0.1:{server.server_port}/v1", **kwargs)
+
+def test_stream_yields_pieces_and_sends_the_request(server):
+    gateway = make_gateway(server)
+    assert list(gateway.stream("How do I grow wheat?")) == ["Hello", " farmer"]
+
+    request = server.requests[0]
+    assert request["path"] == "/v1/completions"
+    assert request["payload"] == dict(SETTINGS, prompt="How do I grow wheat?", stream=True)
+    assert request["headers"]["Authorization"] == "Bearer test-key"
+
+def test_pieces_arrive_before_the_stream_ends(server):
+    server.default = {"pieces": ["Hello", " farmer"], "gap": 0.5}
+    gateway = make_gateway(server)
+    started = time.monotonic()
+    pieces = gateway.stream("q")
+    assert next(pieces) == "Hello"
+    assert time.monotonic() - started < 0.4
+    assert list(pieces) == [" farmer"]
+
+def test_connections_are_reused_between_calls(server):
+    gateway = make_gateway(server)
+    for _ in range(3):
+        assert gateway.complete("q") == "Hello farmer"
+    assert len({request["client"] for request in server.requests}) == 1
+
+def test_retryable_status_is_retried(server):
+    server.script = [{"status": 503}, {"status": 429}]
+    gateway = make_gateway(server, retries=2)
+    assert gateway.complete("q") == "Hello farmer"
+    stats = gateway.stats()
+    assert stats["attempts"] == 3 and stats["retries"] == 2 and stats["failures"] == 0
+
+def test_retries_are_bounded(server):
+    server.default = {"status": 502}
+    gateway = make_gateway(server, retries=1)
+    with pytest.raises(LLMGatewayError):
+        gateway.complete("q")
+    stats = gateway.stats()
+    assert stats["attempts"] == 2 and stats["failures"] == 1
+
+def test_client_error_is_not_retried(server):
+    server.script = [{"status": 400}]
+    gateway = make_gateway(server, retries=2)
+    with pytest.raises(LLMGatewayError, match="HTTP 400"):
+        gateway.complete("q")
+    assert gateway.stats()["attempts"] == 1
+
+def test_stream_is_not_retried_after_the_first_token(server):
+    server.script = [{"pieces": ["Hello", " farmer"], "cut_after": 1}]
+    gateway = make_gateway(server, retries=2)
+    received = []
+    with pytest.raises(LLMGatewayError):
+        for piece in gateway.stream("q"):
+            received.append(piece)
+    assert received == ["Hello"]
+    assert gateway.stats()["attempts"] == 1
+
+def test_slow_provider_hits_the_deadline(server):
+    server.default = {"delay": 1.0}
+    gateway = make_gateway(server, timeout=0.3, retries=2)
+    started = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        gateway.complete("q")
+    assert time.monotonic() - started < 0.9
+    assert gateway.stats()["timeouts"] == 1
+
+def test_concurrency_is_capped_and_queued(server):
+    server.default = {"delay": 0.2}
+    gateway = make_gateway(server, max_concurrency=2, timeout=5)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gateway.complete("q"))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["Hello farmer"] * 5
+    assert server.max_active == 2
+    stats = gateway.stats()
+    assert stats["max_queue_depth"] >= 3 and stats["in_flight"] == 0
+
+def test_queued_call_times_out_waiting_for_a_slot(server):
+    server.default = {"delay": 0.5}
+    gateway = make_gateway(server, max_concurrency=1, timeout=5)
+    holder = threading.Thread(target=gateway.complete, args=("q",))
+    holder.start()
+    while gateway.stats()["in_flight"] == 0:
+        time.sleep(0.01)
+    with pytest.raises(LLMTimeoutError, match="slot"):
+        gateway.complete("q", timeout=0.1)
+    holder.join()
+    assert len(server.requests) == 1
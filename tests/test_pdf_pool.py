@@ -0,0 +1,55 @@
+"""The PDF worker pool must not start a second index build from the app's entry script"""
+
+import os
+import ast
+import sys
+import subprocess
+import multiprocessing
+
+import pytest
+
+# Needs PyPDF2
+pytest.importorskip("pdf_extractor")
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_SCRIPT = """
+import sys
+sys.path.insert(0, {repo!r})
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from pdf_extractor import _pool_context
+
+def start_index_build():
+    with open({marker!r}, "a") as file:
+        file.write(__name__ + "\\n")
+
+# The guard app.py puts around its module-level build
+if {guard}:
+    start_index_build()
+
+if __name__ == "__main__":
+    context = _pool_context() if {method!r} == "default" else multiprocessing.get_context({method!r})
+    with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+        assert list(executor.map(abs, [-1, -2, -3])) == [1, 2, 3]
+"""
+
+def app_build_guard():
+    """Source of the condition around app.py's module-level start_index_build() call"""
+    with open(os.path.join(REPO, "app.py"), "r", encoding="utf-8") as file:
+        source = file.read()
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.If) and "start_index_build()" in ast.get_source_segment(source, node):
+            return ast.get_source_segment(source, node.test)
+    pytest.fail("app.py no longer guards its module-level start_index_build() call")
+
+@pytest.mark.parametrize("method", ["default", "spawn"])
+def test_pool_workers_do_not_rerun_the_build(tmp_path, method):
+    if method == "default" and "forkserver" not in multiprocessing.get_all_start_methods():
+        method = "spawn"
+    marker = tmp_path / "builds.txt"
+    entry = tmp_path / "entry.py"
+    entry.write_text(ENTRY_SCRIPT.format(repo=REPO, marker=str(marker), guard=app_build_guard(), method=method))
+
+    subprocess.run([sys.executable, str(entry)], cwd=tmp_path, check=True, timeout=60)
+    assert marker.read_text().splitlines() == ["__main__"]
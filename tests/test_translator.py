@@ -0,0 +1,143 @@
+"""Translation through the circuit breaker and per-request budget, against a stand-in server"""
+
+import os
+import json
+import time
+import tempfile
+import threading
+import urllib.request
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("googletrans")
+# Keep the module-level translator's cache out of the working tree
+os.environ.setdefault("AGRI_TRANSLATION_CACHE_PATH",
+                      os.path.join(tempfile.mkdtemp(prefix="agri-tests-"), "translation_cache.sqlite"))
+
+import translator
+from circuit_breaker import OPEN
+from translation_cache import TranslationCache
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.server.lock:
+            self.server.texts.append(request["q"])
+        time.sleep(self.server.delay)
+        if self.server.status != 200:
+            self.send_error(self.server.status)
+            return
+        # Line by line, like the real service, so batched requests keep one segment per line
+        text = "\n".join(f"[{request['dest']}] {line}" for line in request["q"].split("\n"))
+        body = json.dumps({"text": text}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class StandInTranslator:
+    """Same call shape as googletrans.Translator, sending every request to the stand-in server"""
+
+    def __init__(self, url):
+        self.url = url
+
+    def translate(self, text, src="auto", dest="en"):
+        data = json.dumps({"q": text, "src": src, "dest": dest}).encode("utf-8")
+        request = urllib.request.Request(self.url, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return SimpleNamespace(text=json.load(response)["text"])
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.lock = threading.Lock()
+    server.texts = []
+    server.delay = 0.0
+    server.status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def support(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(translator, "TRANSLATION_TIMEOUT", 0.3)
+    monkeypatch.setattr(translator, "TRANSLATION_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(translator, "TRANSLATION_RESET_TIMEOUT", 60.0)
+    support = translator.MultiLanguageSupport(cache=TranslationCache(path=str(tmp_path / "translations.sqlite")))
+    support.translator = StandInTranslator(f"http://127.0.0.1:{server.server_port}/translate")
+    return support
+
+def test_translation_goes_upstream_once_and_is_cached(support, server):
+    with support.budget(2.0):
+        assert support.translate_text("Water the wheat.", "hi", "en") == "[hi] Water the wheat."
+        assert support.translate_text("Water the wheat.", "hi", "en") == "[hi] Water the wheat."
+        assert not support.degraded()
+    assert server.texts == ["Water the wheat."]
+
+def test_batch_sends_all_missing_segments_in_one_request(support, server):
+    text = "Plow the field. Sow the seeds.\n- Water daily."
+    with support.budget(2.0):
+        translated = support.translate_segments(text, "hi", "en")
+        assert not support.degraded()
+    assert translated == "[hi] Plow the field. [hi] Sow the seeds.\n- [hi] Water daily."
+    assert len(server.texts) == 1
+
+def test_slow_service_returns_the_original_within_the_budget(support, server):
+    server.delay = 1.0
+    texts = ["Plow the field.", "Sow the seeds.", "Water daily."]
+    started = time.monotonic()
+    with support.budget(0.5):
+        results = [support.translate_text(text, "hi", "en") for text in texts]
+        assert support.degraded()
+    elapsed = time.monotonic() - started
+
+    assert results == texts
+    # One full timeout (0.3s), one call cut short by what was left, then the budget is spent
+    assert elapsed < 0.8
+    assert support.budget_exhausted == 1
+    stats = support.translation_stats()
+    assert stats["timeouts"] == 1 and stats["cut_short"] == 1
+
+def test_degraded_is_scoped_to_the_budget_block(support, server):
+    server.status = 500
+    with support.budget(2.0):
+        support.translate_text("Plow the field.", "hi", "en")
+        assert support.degraded()
+    server.status = 200
+    with support.budget(2.0):
+        assert support.translate_text("Sow the seeds.", "hi", "en") == "[hi] Sow the seeds."
+        assert not support.degraded()
+
+def test_failing_service_opens_the_breaker(support, server):
+    server.status = 500
+    with support.budget(5.0):
+        for text in ("Plow the field.", "Sow the seeds."):
+            assert support.translate_text(text, "hi", "en") == text
+        assert support.breaker.state == OPEN
+
+        # While open, nothing is sent and the original comes back at once
+        sent = len(server.texts)
+        started = time.monotonic()
+        assert support.translate_text("Water daily.", "hi", "en") == "Water daily."
+        assert time.monotonic() - started < 0.05
+        assert len(server.texts) == sent
+        assert support.degraded()
+    assert support.translation_stats()["rejected"] == 1
+
+def test_slow_batch_is_not_retried_segment_by_segment(support, server):
+    server.delay = 1.0
+    text = "Plow the field. Sow the seeds. Water daily."
+    started = time.monotonic()
+    with support.budget(2.0):
+        assert support.translate_segments(text, "hi", "en") == text
+        assert support.degraded()
+    assert time.monotonic() - started < 0.6
+    assert server.texts == ["Plow the field.\nSow the seeds.\nWater daily."]
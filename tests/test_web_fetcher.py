@@ -0,0 +1,139 @@
+"""Website fetcher against a local stub HTTP server"""
+
+import os
+import json
+import socket
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Needs aiohttp or requests, whichever the fetcher runs on
+web_fetcher = pytest.importorskip("web_fetcher")
+
+PAGE = """<html><head><title>t</title><script>var tracking = 1;</script></head>
+<body><nav>Home | About</nav><main><h1>Wheat</h1><p>{text}</p></main><footer>(c) farm</footer></body></html>"""
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.seen.append((self.path, dict(self.headers)))
+        page = self.server.pages.get(self.path)
+        if page is None:
+            self.send_error(404)
+            return
+        if page.get("status", 200) != 200:
+            self.send_error(page["status"])
+            return
+        etag, last_modified = page.get("etag"), page.get("last_modified")
+        if (etag and self.headers.get("If-None-Match") == etag) or \
+                (last_modified and not etag and self.headers.get("If-Modified-Since") == last_modified):
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = page["body"].encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", page.get("content_type", "text/html; charset=utf-8"))
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.pages = {}
+    server.seen = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def url(server, path):
+    return f"http://127.0.0.1:{server.server_port}{path}"
+
+def fetch(server, path, cache_dir):
+    return web_fetcher.fetch_websites([url(server, path)], cache_dir=str(cache_dir), timeout=5)[url(server, path)]
+
+def cache_entry(server, path, cache_dir):
+    with open(web_fetcher._cache_path(url(server, path), str(cache_dir)), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def test_fetch_extracts_main_text_and_persists_validators(server, tmp_path):
+    server.pages["/wheat"] = {"body": PAGE.format(text="Sow in November."), "etag": '"v1"',
+                              "last_modified": "Mon, 05 Oct 2026 10:00:00 GMT"}
+    text = fetch(server, "/wheat", tmp_path)
+    assert "Sow in November." in text
+    assert "tracking" not in text and "Home | About" not in text and "(c) farm" not in text
+
+    entry = cache_entry(server, "/wheat", tmp_path)
+    assert entry["etag"] == '"v1"'
+    assert entry["last_modified"] == "Mon, 05 Oct 2026 10:00:00 GMT"
+    assert entry["text"] == text
+
+def test_unchanged_page_is_revalidated_with_a_conditional_get(server, tmp_path, caplog):
+    server.pages["/wheat"] = {"body": PAGE.format(text="Sow in November."), "etag": '"v1"',
+                              "last_modified": "Mon, 05 Oct 2026 10:00:00 GMT"}
+    first = fetch(server, "/wheat", tmp_path)
+    with caplog.at_level(logging.INFO, logger=web_fetcher.logger.name):
+        second = fetch(server, "/wheat", tmp_path)
+
+    assert second == first
+    _, headers = server.seen[-1]
+    assert headers.get("If-None-Match") == '"v1"'
+    assert headers.get("If-Modified-Since") == "Mon, 05 Oct 2026 10:00:00 GMT"
+    assert "1 not_modified" in caplog.text
+
+def test_last_modified_alone_is_enough_for_a_304(server, tmp_path, caplog):
+    server.pages["/rice"] = {"body": PAGE.format(text="Transplant after 25 days."),
+                             "last_modified": "Tue, 06 Oct 2026 08:00:00 GMT"}
+    first = fetch(server, "/rice", tmp_path)
+    assert cache_entry(server, "/rice", tmp_path)["etag"] is None
+    with caplog.at_level(logging.INFO, logger=web_fetcher.logger.name):
+        assert fetch(server, "/rice", tmp_path) == first
+    assert "If-None-Match" not in server.seen[-1][1]
+    assert "1 not_modified" in caplog.text
+
+def test_changed_page_replaces_the_cached_copy(server, tmp_path):
+    server.pages["/wheat"] = {"body": PAGE.format(text="Sow in November."), "etag": '"v1"'}
+    fetch(server, "/wheat", tmp_path)
+    server.pages["/wheat"] = {"body": PAGE.format(text="Sow in early December."), "etag": '"v2"'}
+
+    assert "Sow in early December." in fetch(server, "/wheat", tmp_path)
+    assert server.seen[-1][1].get("If-None-Match") == '"v1"'
+    assert cache_entry(server, "/wheat", tmp_path)["etag"] == '"v2"'
+
+def test_plain_text_is_kept_as_is(server, tmp_path):
+    server.pages["/notes.txt"] = {"body": "Irrigate   every\n\n\n10 days.", "content_type": "text/plain; charset=utf-8"}
+    assert fetch(server, "/notes.txt", tmp_path) == "Irrigate every\n10 days."
+
+def test_server_error_falls_back_to_the_cached_copy(server, tmp_path, caplog):
+    server.pages["/wheat"] = {"body": PAGE.format(text="Sow in November."), "etag": '"v1"'}
+    first = fetch(server, "/wheat", tmp_path)
+    server.pages["/wheat"] = {"status": 500}
+    with caplog.at_level(logging.INFO, logger=web_fetcher.logger.name):
+        assert fetch(server, "/wheat", tmp_path) == first
+    assert "1 stale" in caplog.text
+    # The cached copy and its validators survive the failure
+    assert cache_entry(server, "/wheat", tmp_path)["etag"] == '"v1"'
+
+def test_missing_page_without_a_cached_copy_is_empty(server, tmp_path, caplog):
+    with caplog.at_level(logging.INFO, logger=web_fetcher.logger.name):
+        assert fetch(server, "/missing", tmp_path) == ""
+    assert "1 failed" in caplog.text
+    assert not os.path.exists(web_fetcher._cache_path(url(server, "/missing"), str(tmp_path)))
+
+def test_unreachable_host_is_empty(tmp_path):
+    # A port nothing listens on: bind one, then close it
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    address = f"http://127.0.0.1:{port}/"
+    assert web_fetcher.fetch_websites([address], cache_dir=str(tmp_path), timeout=2) == {address: ""}
@@ -0,0 +1,107 @@
+"""
+Translation Cache
+In-process LRU in front of an SQLite store of translations shared by all workers
+"""
+
+import os
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+TRANSLATION_CACHE_PATH = os.getenv("AGRI_TRANSLATION_CACHE_PATH", "translation_cache.sqlite")
+TRANSLATION_CACHE_SIZE = int(os.getenv("AGRI_TRANSLATION_CACHE_SIZE", "4096"))
+
+class TranslationCache:
+    """
+    Two-tier cache of translations keyed by (text hash, source, target).
+
+    Lookups try a per-process LRU first and then the SQLite file, which
+    every worker opens and which survives restarts; a disk hit is promoted
+    into the LRU. Only successful translations are stored, so a failed
+    upstream call is retried next time rather than cached as the original.
+    """
+
+    def __init__(self, path=TRANSLATION_CACHE_PATH, size=TRANSLATION_CACHE_SIZE):
+        self.path = path
+        self.size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            "key TEXT NOT NULL, source TEXT NOT NULL, target TEXT NOT NULL, value TEXT NOT NULL, "
+            "PRIMARY KEY (key, source, target)) WITHOUT ROWID"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, memory_key, value):
+        # Caller holds self._lock
+        self._memory[memory_key] = value
+        self._memory.move_to_end(memory_key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def get(self, text, source, target):
+        """The cached translation of `text`, or None"""
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        memory_key = (key, source, target)
+        with self._lock:
+            value = self._memory.get(memory_key)
+            if value is not None:
+                self._memory.move_to_end(memory_key)
+                self.memory_hits += 1
+                return value
+        row = self._connect().execute(
+            "SELECT value FROM translations WHERE key = ? AND source = ? AND target = ?", memory_key
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(memory_key, row[0])
+        return row[0]
+
+    def put(self, text, source, target, value):
+        key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO translations (key, source, target, value) VALUES (?, ?, ?, ?)",
+                (key, source, target, value)
+            )
+        except sqlite3.Error as e:
+            # The translation is still remembered in this process
+            logger.warning(f"Could not store translation: {e}")
+        with self._lock:
+            self._remember((key, source, target), value)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / total, 4) if total else 0.0,
+                "memory_entries": len(self._memory)
+            }
+
+# Initialize the translation cache
+translation_cache = TranslationCache()
@@ -1,15 +1,81 @@
+import os
+import re
+import time
 import logging
+import threading
+from contextlib import contextmanager
 from googletrans import Translator
-from langdetect import detect
 import json
 
+from translation_cache import translation_cache
+from language_detect import detect_language
+from glossary import load_glossaries
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CallTimeoutError
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Characters sent to Google Translate in one batched request
+TRANSLATION_BATCH_CHARS = 4500
+# Seconds one upstream call may take, and all the calls made for one request together
+TRANSLATION_TIMEOUT = float(os.getenv("AGRI_TRANSLATION_TIMEOUT", "3"))
+TRANSLATION_BUDGET = float(os.getenv("AGRI_TRANSLATION_BUDGET", "8"))
+# Consecutive failures that open the circuit, and seconds between recovery probes while it is open
+TRANSLATION_FAILURE_THRESHOLD = int(os.getenv("AGRI_TRANSLATION_FAILURES", "5"))
+TRANSLATION_RESET_TIMEOUT = float(os.getenv("AGRI_TRANSLATION_RESET", "30"))
+# Comma-separated hosts; point at a local stand-in server to test slow or failing translation
+TRANSLATION_SERVICE_URLS = [url.strip() for url in os.getenv("AGRI_TRANSLATION_SERVICE_URLS", "").split(",") if url.strip()]
+
+_EMOJI = "\U0001F000-\U0001FAFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D"
+# Bullets, list numbers, quote/heading markers and emoji at the start of a line
+_LEADING_MARKERS_RE = re.compile(rf"^(?:[\s>#*•\-–|{_EMOJI}]|\d+[.)](?=\s))*")
+# Bold/code markers and emoji inside a line
+_INLINE_MARKERS_RE = re.compile(rf"(\*\*|__|`|[{_EMOJI}]+)")
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?।])(\s+)")
+
+def split_segments(text):
+    """
+    Split text into ("text", segment) parts to translate and ("markup", literal)
+    parts kept as they are: line breaks, bullets, markdown markers and emoji.
+    Joining all the parts gives back `text`.
+    """
+    parts = []
+    for line in re.split(r"(\n)", text):
+        leading = _LEADING_MARKERS_RE.match(line).group()
+        if leading:
+            parts.append(("markup", leading))
+        for i, piece in enumerate(_INLINE_MARKERS_RE.split(line[len(leading):])):
+            if i % 2:
+                parts.append(("markup", piece))
+                continue
+            for j, sentence in enumerate(_SENTENCE_BREAK_RE.split(piece)):
+                stripped = sentence.strip()
+                if j % 2 or not any(char.isalpha() for char in stripped):
+                    parts.append(("markup", sentence))
+                    continue
+                start = sentence.index(stripped)
+                parts.append(("markup", sentence[:start]))
+                parts.append(("text", stripped))
+                parts.append(("markup", sentence[start + len(stripped):]))
+    return [part for part in parts if part[1]]
+
 class MultiLanguageSupport:
-    def __init__(self):
-        self.translator = Translator()
+    def __init__(self, cache=translation_cache):
+        self.translator = Translator(service_urls=TRANSLATION_SERVICE_URLS) if TRANSLATION_SERVICE_URLS else Translator()
+        # Upstream calls fail fast while the service is down (see circuit_breaker.py)
+        self.breaker = CircuitBreaker(
+            "translation",
+            probe=lambda: self.translator.translate("hello", src='en', dest='hi'),
+            failure_threshold=TRANSLATION_FAILURE_THRESHOLD,
+            reset_timeout=TRANSLATION_RESET_TIMEOUT,
+            timeout=TRANSLATION_TIMEOUT
+        )
+        self._budget = threading.local()
+        self._budget_lock = threading.Lock()
+        self.budget_exhausted = 0
+        # Translations already fetched, shared with the other workers (see translation_cache.py)
+        self.cache = cache
         self.supported_languages = {
             'en': 'English',
             'hi': 'Hindi',
@@ -36,50 +102,14 @@ class MultiLanguageSupport:
             'ur': 'Urdu'
         }
         
-        # Agricultural terms dictionary for better translation
-        self.agriculture_terms = {
-            'en': {
-                'crop': 'crop',
-                'farming': 'farming',
-                'agriculture': 'agriculture',
-                'soil': 'soil',
-                'fertilizer': 'fertilizer',
-                'irrigation': 'irrigation',
-                'harvest': 'harvest',
-                'pesticide': 'pesticide',
-                'seed': 'seed',
-                'plant': 'plant'
-            },
-            'hi': {
-                'crop': 'फसल',
-                'farming': 'खेती',
-                'agriculture': 'कृषि',
-                'soil': 'मिट्टी',
-                'fertilizer': 'उर्वरक',
-                'irrigation': 'सिंचाई',
-                'harvest': 'फसल काटना',
-                'pesticide': 'कीटनाशक',
-                'seed': 'बीज',
-                'plant': 'पौधा'
-            },
-            'es': {
-                'crop': 'cultivo',
-                'farming': 'agricultura',
-                'agriculture': 'agricultura',
-                'soil': 'suelo',
-                'fertilizer': 'fertilizante',
-                'irrigation': 'riego',
-                'harvest': 'cosecha',
-                'pesticide': 'pesticida',
-                'seed': 'semilla',
-                'plant': 'planta'
-            }
-        }
+        # Agricultural terms for better translation, one Data/glossary/<language>.json per language
+        self.glossaries = load_glossaries(self.supported_languages)
 
     def detect_language(self, text):
         """Detect the language of input text"""
         try:
-            detected_lang = detect(text)
+            # Script decides most non-Latin languages; langdetect is only consulted for Latin text
+            detected_lang = detect_language(text)
             if detected_lang in self.supported_languages:
                 return detected_lang
             return 'en'  # Default to English
@@ -87,16 +117,72 @@ class MultiLanguageSupport:
             logger.error(f"Error detecting language: {str(e)}")
             return 'en'
 
+    @contextmanager
+    def budget(self, seconds=TRANSLATION_BUDGET):
+        """
+        Let the upstream calls made inside the block spend `seconds` in total.
+        Only time spent waiting on the translation service counts, not time
+        spent between calls (e.g. while the LLM streams the answer).
+        """
+        previous = getattr(self._budget, "remaining", None), getattr(self._budget, "degraded", False)
+        self._budget.remaining = seconds
+        self._budget.degraded = False
+        try:
+            yield
+        finally:
+            self._budget.remaining, self._budget.degraded = previous
+
+    def _note_degraded(self):
+        if getattr(self._budget, "remaining", None) is not None:
+            self._budget.degraded = True
+
+    def degraded(self):
+        """True when a translation inside the current budget block fell back to the original text"""
+        return getattr(self._budget, "degraded", False)
+
+    def _upstream(self, text, source_language, target_language):
+        """One call to the translation service, within the breaker and what is left of the budget"""
+        remaining = getattr(self._budget, "remaining", None)
+        if remaining is not None and remaining <= 0:
+            with self._budget_lock:
+                self.budget_exhausted += 1
+            raise CallTimeoutError("translation budget for this request is spent")
+        started = time.monotonic()
+        try:
+            return self.breaker.call(self.translator.translate, text, src=source_language, dest=target_language,
+                                     timeout=remaining).text
+        finally:
+            if remaining is not None:
+                self._budget.remaining = remaining - (time.monotonic() - started)
+
+    def translation_stats(self):
+        return {
+            **self.breaker.stats(),
+            "budget_exhausted": self.budget_exhausted,
+            "timeout_s": self.breaker.timeout,
+            "budget_s": TRANSLATION_BUDGET
+        }
+
     def translate_text(self, text, target_language='en', source_language='auto'):
         """Translate text to target language"""
         try:
-            if source_language == target_language:
+            if source_language == target_language or not text.strip():
                 return text
             
-            result = self.translator.translate(text, src=source_language, dest=target_language)
-            return result.text
+            cached = self.cache.get(text, source_language, target_language)
+            if cached is not None:
+                return cached
+            
+            translated = self._upstream(text, source_language, target_language)
+            self.cache.put(text, source_language, target_language, translated)
+            return translated
+        except (CircuitOpenError, CallTimeoutError) as e:
+            logger.warning(f"Translation skipped: {str(e)}")
+            self._note_degraded()
+            return text
         except Exception as e:
             logger.error(f"Error translating text: {str(e)}")
+            self._note_degraded()
             return text  # Return original text if translation fails
 
     def get_greeting_message(self, language_code='en'):
@@ -118,17 +204,73 @@ class MultiLanguageSupport:
         """Get available language options for frontend"""
         return [{'code': code, 'name': name} for code, name in self.supported_languages.items()]
 
+    def _translate_batch(self, segments, target_language, source_language):
+        """Translate segments in as few upstream requests as possible; returns {segment: translation}"""
+        translations = {}
+        batch, size = [], 0
+        for segment in segments + [None]:
+            if segment is not None and size + len(segment) < TRANSLATION_BATCH_CHARS:
+                batch.append(segment)
+                size += len(segment) + 1
+                continue
+            if batch:
+                # One request per batch, one segment per line; fall back to one request per segment
+                # if the line structure doesn't survive translation
+                lines = None
+                skipped = False
+                try:
+                    lines = self._upstream("\n".join(batch), source_language, target_language).split("\n")
+                except (CircuitOpenError, CallTimeoutError) as e:
+                    logger.warning(f"Translation skipped: {str(e)}")
+                    skipped = True
+                except Exception as e:
+                    logger.error(f"Error translating batch: {str(e)}")
+                if skipped:
+                    # Retrying segment by segment would only wait on the same slow service
+                    self._note_degraded()
+                    translations.update((original, original) for original in batch)
+                elif lines is not None and len(lines) == len(batch):
+                    for original, translated in zip(batch, lines):
+                        translations[original] = translated.strip()
+                        self.cache.put(original, source_language, target_language, translated.strip())
+                else:
+                    for original in batch:
+                        translations[original] = self.translate_text(original, target_language, source_language)
+            batch, size = ([segment], len(segment) + 1) if segment is not None else ([], 0)
+        return translations
+
+    def translate_segments(self, text, target_language='en', source_language='auto'):
+        """
+        Translate text sentence by sentence, keeping its layout, bullets,
+        markdown markers and emoji. Each distinct sentence is looked up in
+        the translation cache and only the missing ones are sent upstream,
+        together in one batched request.
+        """
+        if source_language == target_language:
+            return text
+        parts = split_segments(text)
+        segments = list(dict.fromkeys(part for kind, part in parts if kind == "text"))
+        translations = {}
+        missing = []
+        for segment in segments:
+            cached = self.cache.get(segment, source_language, target_language)
+            if cached is None:
+                missing.append(segment)
+            else:
+                translations[segment] = cached
+        if missing:
+            translations.update(self._translate_batch(missing, target_language, source_language))
+        return "".join(translations.get(part, part) if kind == "text" else part for kind, part in parts)
+
     def enhance_agricultural_translation(self, text, target_language):
         """Enhance translation with agricultural context"""
         try:
-            translated = self.translate_text(text, target_language)
+            translated = self.translate_segments(text, target_language)
             
-            # Replace common agricultural terms with more accurate translations
-            if target_language in self.agriculture_terms:
-                terms = self.agriculture_terms[target_language]
-                for en_term, local_term in terms.items():
-                    # Simple replacement - in production, you'd want more sophisticated NLP
-                    translated = translated.replace(en_term, local_term)
+            # Replace agricultural terms left in English with more accurate translations
+            glossary = self.glossaries.get(target_language)
+            if glossary is not None:
+                translated = glossary.apply(translated)
             
             return translated
         except Exception as e:
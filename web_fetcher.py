@@ -0,0 +1,219 @@
+"""
+Website Fetcher
+Fetches source pages concurrently with a conditional GET cache and strips them to text
+"""
+
+import os
+import json
+import codecs
+import asyncio
+import hashlib
+import logging
+from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    import requests
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+WEB_CACHE_DIRECTORY = os.getenv("AGRI_WEB_CACHE_DIR", "web_cache")
+PER_HOST_LIMIT = 4
+FETCH_TIMEOUT = 15
+READ_BLOCK_SIZE = 64 * 1024
+# Prefer <main>/<article> text once it is at least this long
+MIN_MAIN_TEXT = 200
+
+class HTMLTextExtractor(HTMLParser):
+    """Streaming HTML to text converter that drops scripts, styles and page chrome"""
+
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head', 'nav',
+                 'header', 'footer', 'aside', 'form', 'iframe', 'button', 'select'}
+    MAIN_TAGS = {'main', 'article'}
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'ul', 'ol', 'tr', 'td', 'th', 'table', 'section',
+                  'article', 'main', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'blockquote',
+                  'dd', 'dt', 'dl', 'hr'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._all_text = []
+        self._main_text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in self.MAIN_TAGS:
+            self._main_depth += 1
+        if tag in self.BLOCK_TAGS:
+            self._append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCK_TAGS:
+            self._append("\n")
+        if tag in self.SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.MAIN_TAGS:
+            self._main_depth = max(0, self._main_depth - 1)
+
+    def handle_data(self, data):
+        if not self._skip_depth and data.strip():
+            self._append(data)
+
+    def _append(self, text):
+        if self._skip_depth:
+            return
+        self._all_text.append(text)
+        if self._main_depth:
+            self._main_text.append(text)
+
+    def get_text(self):
+        self.close()
+        main_text = _normalize("".join(self._main_text))
+        if len(main_text) >= MIN_MAIN_TEXT:
+            return main_text
+        return _normalize("".join(self._all_text))
+
+class PlainTextCollector:
+    """Same interface as HTMLTextExtractor for non-HTML responses"""
+
+    def __init__(self):
+        self._parts = []
+
+    def feed(self, text):
+        self._parts.append(text)
+
+    def get_text(self):
+        return _normalize("".join(self._parts))
+
+def _normalize(text):
+    lines = (" ".join(line.split()) for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+def _make_parser(content_type):
+    if content_type and "html" not in content_type.lower() and content_type.lower().startswith("text/"):
+        return PlainTextCollector()
+    return HTMLTextExtractor()
+
+def _make_decoder(charset):
+    try:
+        return codecs.getincrementaldecoder(charset or "utf-8")(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+def _cache_path(url, cache_dir):
+    return os.path.join(cache_dir, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + ".json")
+
+def _load_entry(url, cache_dir):
+    try:
+        with open(_cache_path(url, cache_dir), "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+def _save_entry(url, entry, cache_dir):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(url, cache_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(entry, file)
+    os.replace(tmp_path, path)
+
+def _conditional_headers(entry):
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def _store_response(url, entry, headers, body_hash, text, cache_dir):
+    """Cache a 200 response and report whether its body actually changed"""
+    status = "unchanged" if entry and entry.get("body_hash") == body_hash else "fetched"
+    _save_entry(url, {
+        "url": url,
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+        "body_hash": body_hash,
+        "text": text
+    }, cache_dir)
+    return text, status
+
+def _fallback(url, entry, error):
+    if entry:
+        logger.warning(f"Error fetching content from {url}, using cached copy: {error}")
+        return entry["text"], "stale"
+    logger.error(f"Error fetching content from {url}: {error}")
+    return "", "failed"
+
+async def _fetch_one(session, url, cache_dir):
+    entry = _load_entry(url, cache_dir)
+    try:
+        async with session.get(url, headers=_conditional_headers(entry)) as response:
+            if response.status == 304 and entry:
+                return entry["text"], "not_modified"
+            response.raise_for_status()
+            parser = _make_parser(response.headers.get("Content-Type"))
+            decoder = _make_decoder(response.charset)
+            body_hash = hashlib.sha256()
+            async for block in response.content.iter_chunked(READ_BLOCK_SIZE):
+                body_hash.update(block)
+                parser.feed(decoder.decode(block))
+            parser.feed(decoder.decode(b"", final=True))
+            return _store_response(url, entry, response.headers, body_hash.hexdigest(),
+                                   parser.get_text(), cache_dir)
+    except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+        return _fallback(url, entry, e)
+
+async def _fetch_all(urls, cache_dir, per_host_limit, timeout):
+    connector = aiohttp.TCPConnector(limit_per_host=per_host_limit)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+        return await asyncio.gather(*(_fetch_one(session, url, cache_dir) for url in urls))
+
+def _fetch_one_blocking(url, cache_dir, timeout):
+    entry = _load_entry(url, cache_dir)
+    try:
+        with requests.get(url, headers=_conditional_headers(entry), timeout=timeout, stream=True) as response:
+            if response.status_code == 304 and entry:
+                return entry["text"], "not_modified"
+            response.raise_for_status()
+            parser = _make_parser(response.headers.get("Content-Type"))
+            decoder = _make_decoder(response.encoding)
+            body_hash = hashlib.sha256()
+            for block in response.iter_content(READ_BLOCK_SIZE):
+                body_hash.update(block)
+                parser.feed(decoder.decode(block))
+            parser.feed(decoder.decode(b"", final=True))
+            return _store_response(url, entry, response.headers, body_hash.hexdigest(),
+                                   parser.get_text(), cache_dir)
+    except (requests.RequestException, OSError) as e:
+        return _fallback(url, entry, e)
+
+def fetch_websites(urls, cache_dir=WEB_CACHE_DIRECTORY, per_host_limit=PER_HOST_LIMIT, timeout=FETCH_TIMEOUT):
+    """
+    Fetch every URL concurrently and return {url: main text}.
+
+    Each page is revalidated with If-None-Match / If-Modified-Since against
+    the on-disk cache, so an unchanged page costs a single 304. Pages that
+    fail to load fall back to their last cached text, or "" if never fetched.
+    """
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+    if AIOHTTP_AVAILABLE:
+        results = asyncio.run(_fetch_all(urls, cache_dir, per_host_limit, timeout))
+    else:
+        with ThreadPoolExecutor(max_workers=per_host_limit) as executor:
+            results = list(executor.map(lambda url: _fetch_one_blocking(url, cache_dir, timeout), urls))
+
+    statuses = [status for _, status in results]
+    logger.info(f"Fetched {len(urls)} pages: " + ", ".join(
+        f"{statuses.count(s)} {s}" for s in ("fetched", "unchanged", "not_modified", "stale", "failed") if s in statuses))
+    return {url: text for url, (text, _) in zip(urls, results)}